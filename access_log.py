@@ -0,0 +1,74 @@
+"""
+Persisted request counts for the Movie Recommendation System.
+
+Counts how often recommendations are requested for each movie and saves them
+to a small JSON file, so the most requested movies are still known after a
+restart. Several workers can share the file: each one only adds the requests
+it saw since its last flush.
+"""
+import atexit
+import json
+import os
+import threading
+import time
+from collections import Counter
+
+import config
+
+
+class AccessLog:
+    """Thread-safe per-movie request counter backed by a JSON file.
+
+    Args:
+        path: JSON file the counts are persisted to
+        flush_seconds: Minimum time between automatic flushes
+    """
+
+    def __init__(self, path=None, flush_seconds=None):
+        self.path = path or config.ACCESS_LOG_PATH
+        self.flush_seconds = (config.ACCESS_LOG_FLUSH_SECONDS
+                              if flush_seconds is None else flush_seconds)
+        self._lock = threading.Lock()
+        self._counts = self._read()
+        self._pending = Counter()  # Requests not written to disk yet
+        self._last_flush = time.monotonic()
+        atexit.register(self.flush)
+
+    def _read(self):
+        try:
+            with open(self.path) as f:
+                return Counter({int(k): v for k, v in json.load(f).items()})
+        except (OSError, ValueError):
+            return Counter()
+
+    def record(self, movie_id):
+        """Count one request for a movie, flushing to disk when due."""
+        with self._lock:
+            self._pending[int(movie_id)] += 1
+            due = time.monotonic() - self._last_flush >= self.flush_seconds
+        if due:
+            self.flush()
+
+    def flush(self):
+        """Add the pending counts to the file on disk."""
+        with self._lock:
+            if not self._pending:
+                return
+            counts = self._read()
+            counts.update(self._pending)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            try:
+                with open(tmp_path, 'w') as f:
+                    json.dump({str(k): v for k, v in counts.items()}, f)
+                os.replace(tmp_path, self.path)
+            except OSError:
+                return  # Keep the pending counts for the next attempt
+            self._counts = counts
+            self._pending.clear()
+            self._last_flush = time.monotonic()
+
+    def most_common(self, n):
+        """Return the ids of the `n` most requested movies, most requested first."""
+        with self._lock:
+            counts = self._counts + self._pending
+        return [movie_id for movie_id, _ in counts.most_common(n)]
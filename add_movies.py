@@ -16,6 +16,7 @@ Usage:
     python add_movies.py --tmdb-id 155
     python add_movies.py --imdb-id tt0468569
     python add_movies.py --batch movies_to_add.txt
+    python add_movies.py --refresh
 """
 
 import os
@@ -25,11 +26,20 @@ import argparse
 import requests
 import pandas as pd
 from ast import literal_eval
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+import config
+import metadata_delta
 
 # TMDB API configuration
 TMDB_API_KEY = os.getenv("TMDB_API_KEY")
-TMDB_BASE_URL = "https://api.themoviedb.org/3"
+TMDB_BASE_URL = os.getenv("TMDB_BASE_URL", "https://api.themoviedb.org/3")
 POSTER_BASE_URL = "https://www.themoviedb.org/t/p/original"
+# TMDB's changes endpoint accepts at most 14 days per query
+CHANGES_MAX_DAYS = 14
+# Seconds to wait for TMDB to connect or send data
+TMDB_TIMEOUT = 10
 
 
 def search_movie(title):
@@ -40,7 +50,7 @@ def search_movie(title):
         "query": title,
         "include_adult": False
     }
-    response = requests.get(url, params=params)
+    response = requests.get(url, params=params, timeout=TMDB_TIMEOUT)
     if response.status_code == 200:
         results = response.json().get("results", [])
         if results:
@@ -55,12 +65,21 @@ def get_movie_details(tmdb_id):
         "api_key": TMDB_API_KEY,
         "append_to_response": "credits"
     }
-    response = requests.get(url, params=params)
+    response = requests.get(url, params=params, timeout=TMDB_TIMEOUT)
     if response.status_code == 200:
         return response.json()
     return None
 
 
+def _fetch_movie_details(tmdb_id):
+    """get_movie_details for the refresh: a network error fails only this movie."""
+    try:
+        return get_movie_details(tmdb_id)
+    except (requests.RequestException, ValueError) as e:
+        print(f"⚠️ Request for TMDB ID {tmdb_id} failed: {e}")
+        return None
+
+
 def find_by_imdb_id(imdb_id):
     """Find TMDB movie by IMDB ID."""
     url = f"{TMDB_BASE_URL}/find/{imdb_id}"
@@ -68,7 +87,7 @@ def find_by_imdb_id(imdb_id):
         "api_key": TMDB_API_KEY,
         "external_source": "imdb_id"
     }
-    response = requests.get(url, params=params)
+    response = requests.get(url, params=params, timeout=TMDB_TIMEOUT)
     if response.status_code == 200:
         results = response.json().get("movie_results", [])
         if results:
@@ -76,9 +95,37 @@ def find_by_imdb_id(imdb_id):
     return None
 
 
-def load_existing_data():
+def get_changed_movie_ids(start_date, end_date):
+    """Get the TMDB IDs of all movies changed between two dates."""
+    url = f"{TMDB_BASE_URL}/movie/changes"
+    changed = set()
+    
+    window_start = start_date
+    while window_start <= end_date:
+        window_end = min(window_start + timedelta(days=CHANGES_MAX_DAYS - 1), end_date)
+        page = 1
+        total_pages = 1
+        while page <= total_pages:
+            params = {
+                "api_key": TMDB_API_KEY,
+                "start_date": window_start.isoformat(),
+                "end_date": window_end.isoformat(),
+                "page": page
+            }
+            response = requests.get(url, params=params, timeout=TMDB_TIMEOUT)
+            response.raise_for_status()
+            data = response.json()
+            changed.update(r["id"] for r in data.get("results", []))
+            total_pages = data.get("total_pages", 1)
+            page += 1
+        window_start = window_end + timedelta(days=1)
+    
+    return changed
+
+
+def load_existing_data(path="movie_data.csv"):
     """Load existing movie data and get the master lists."""
-    df = pd.read_csv("movie_data.csv", index_col='id')
+    df = pd.read_csv(path, index_col='id')
     
     # Parse the list columns
     for col in ['Genre list', 'Top actor list', 'Director list', 'Genres bin', 'Actors bin', 'Director bin']:
@@ -242,6 +289,63 @@ def add_movies_from_file(filename):
     print(f"\n📊 Summary: {success} added, {failed} failed")
 
 
+def _read_refresh_state(state_path):
+    try:
+        with open(state_path) as f:
+            return datetime.fromisoformat(json.load(f)["last_run"])
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def refresh_metadata(since=None, catalog_path="movie_data.csv", delta_path=None, state_path=None):
+    """Refresh popularity, posters and credits of movies changed on TMDB since the last run.
+    
+    Only movies in the catalog that TMDB reports as changed are fetched. The
+    updates are written to the metadata delta file, the catalog itself is
+    not rewritten. Credits are stored as names, they are encoded with the
+    catalog's own vocabulary when the delta is applied.
+    
+    Returns:
+        Number of movies updated
+    """
+    delta_path = delta_path or config.MOVIE_DELTA_PATH
+    state_path = state_path or config.REFRESH_STATE_PATH
+    
+    now = datetime.now(timezone.utc)
+    start = since or _read_refresh_state(state_path) or now - timedelta(days=1)
+    print(f"🔍 Looking for changes since {start.date()}")
+    
+    changed = get_changed_movie_ids(start.date(), now.date())
+    df, genre_list, actor_list, director_list = load_existing_data(catalog_path)
+    ids = sorted(i for i in changed if i in df.index)
+    print(f"   {len(changed)} changed on TMDB, {len(ids)} in our catalog")
+    
+    # Details requests are independent, fetch them concurrently
+    with ThreadPoolExecutor(max_workers=config.REFRESH_WORKERS) as pool:
+        all_details = list(pool.map(_fetch_movie_details, ids))
+    
+    rows = []
+    failed = 0
+    for tmdb_id, details in zip(ids, all_details):
+        if not details:
+            print(f"❌ Could not fetch details for TMDB ID: {tmdb_id}")
+            failed += 1
+            continue
+        movie = process_movie(details, df, genre_list, actor_list, director_list)
+        rows.append({col: movie[col] for col in ['id'] + metadata_delta.DELTA_COLUMNS})
+    
+    if rows:
+        metadata_delta.write_delta(delta_path, rows)
+    
+    # Retry the failed movies next time by not moving the window forward
+    if not failed:
+        with open(state_path, 'w') as f:
+            json.dump({"last_run": now.isoformat()}, f)
+    
+    print(f"\n📊 Summary: {len(rows)} refreshed, {failed} failed")
+    return len(rows)
+
+
 def rebuild_binary_vectors():
     """Rebuild all binary vectors (use after adding many new movies with new actors/genres)."""
     print("🔄 Rebuilding binary vectors...")
@@ -252,6 +356,12 @@ def rebuild_binary_vectors():
     for col in ['Genre list', 'Top actor list', 'Director list']:
         df[col] = df[col].apply(lambda x: literal_eval(x) if isinstance(x, str) else x)
     
+    # Fold refreshed metadata into the catalog
+    delta = metadata_delta.read_delta(config.MOVIE_DELTA_PATH)
+    if delta is not None:
+        # All binary vectors are rebuilt below, with the refreshed names
+        print(f"   Applying metadata delta for {metadata_delta.apply_delta(df, delta, encode=False)} movies")
+    
     # Build complete master lists
     all_genres = set()
     all_actors = set()
@@ -284,6 +394,8 @@ def rebuild_binary_vectors():
     
     # Save
     df.to_csv("movie_data.csv")
+    if delta is not None:
+        os.remove(config.MOVIE_DELTA_PATH)
     print("✅ Binary vectors rebuilt!")
 
 
@@ -295,6 +407,10 @@ def main():
     parser.add_argument("--batch", "-b", help="File with movie titles (one per line)")
     parser.add_argument("--rebuild", "-r", action="store_true", 
                         help="Rebuild binary vectors after adding movies")
+    parser.add_argument("--refresh", action="store_true",
+                        help="Refresh popularity, posters and credits of movies changed on TMDB")
+    parser.add_argument("--since", type=datetime.fromisoformat,
+                        help="With --refresh: look for changes since this date (YYYY-MM-DD)")
     
     args = parser.parse_args()
     
@@ -314,6 +430,8 @@ def main():
         add_movies_from_file(args.batch)
     elif args.rebuild:
         rebuild_binary_vectors()
+    elif args.refresh:
+        refresh_metadata(since=args.since)
     else:
         parser.print_help()
 
@@ -1,7 +1,8 @@
 import streamlit as st
-import pandas as pd
 import my_functions as myfn
 import config
+import warmup
+from poster_cache import to_data_uri
 
 # Page configuration
 st.set_page_config(
@@ -15,16 +16,90 @@ st.set_page_config(
 with open('style.css') as f:
     st.markdown(f'<style>{f.read()}</style>', unsafe_allow_html=True)
 
-# Load data with caching
-@st.cache_data
-def load_data():
+
+@st.cache_resource
+def start_cache_warmup():
+    """Start the background warm-up once per server process."""
+    return warmup.start_warmup()
+
+
+warmup_scheduler = start_cache_warmup()
+
+# Pick up metadata refreshed by `add_movies.py --refresh` without a restart
+myfn.sync_metadata_delta()
+
+
+def img_src(poster):
+    """Turn a cached thumbnail path into something an <img> tag can load."""
+    if poster.startswith('http'):
+        return poster
     try:
-        return pd.read_csv(config.MOVIE_DATA_PATH, index_col='id')
-    except FileNotFoundError:
-        st.error("❌ Movie data file not found. Please check the data path.")
-        return None
+        return to_data_uri(poster)
+    except OSError:
+        return config.DEFAULT_POSTER_URL  # Evicted since it was looked up
+
+
+def poster_image(movie_id):
+    """Thumbnail for st.image: the image bytes, or the placeholder URL."""
+    poster = myfn.get_movie_thumbnail(movie_id)
+    if poster.startswith('http'):
+        return poster
+    try:
+        with open(poster, 'rb') as f:
+            return f.read()
+    except OSError:
+        return config.DEFAULT_POSTER_URL  # Evicted since it was looked up
+
+
+# --- View payloads ---
+# Built once per dataset version and shared by all sessions, so a rerun only
+# pays for what actually changed. The version argument is the cache key.
+
+@st.cache_data
+def movie_options(version):
+    """Selectbox options: (movie_id, title), newest first."""
+    return myfn.get_all_movies()
+
+
+@st.cache_data
+def new_arrivals_grid(version, limit=18):
+    """Grid data for the New Arrivals tab: (movie_id, title)."""
+    return [(mid, title) for mid, title, _ in myfn.get_new_arrivals(limit=limit)]
+
+
+@st.cache_data(max_entries=config.MAX_CACHE_SIZE)
+def recommendation_cards(version, idd, genres, min_popularity, exclude_ids, mmr_lambda):
+    """Recommendation cards: (movie_id, title, details_text).
+    
+    Posters are not part of the payload: they are resolved at render time, so
+    a poster still downloading is shown as soon as it is cached.
+    """
+    recommendations = myfn.get_recommendations(
+        idd,
+        genres=genres,
+        min_popularity=min_popularity,
+        exclude_ids=exclude_ids,
+        mmr_lambda=mmr_lambda,
+        record_access=False  # Counted by the caller, also on cache hits
+    )
+    
+    cards = []
+    for rec_text, rec_id in recommendations:
+        rec_title = rec_text.split('\n')[0].strip() # Extract title
+        cards.append((rec_id, rec_title, rec_text.replace(rec_title, "").strip()))
+    return cards
+
+
+def card_html(rec_id, rec_title):
+    """HTML for one recommendation card with its current poster thumbnail."""
+    rec_poster = img_src(myfn.get_movie_thumbnail(rec_id))
+    return f"""
+            <div class="movie-card">
+                <img src="{rec_poster}" style="width:100%; border-radius:8px; margin-bottom:10px;">
+                <div class="movie-title">{rec_title}</div>
+            </div>
+            """
 
-df = load_data()
 
 # Sidebar
 with st.sidebar:
@@ -45,9 +120,103 @@ with st.sidebar:
         unsafe_allow_html=True
     )
     st.markdown("---")
+    
+    # Recommendation filters
+    st.markdown("### 🎛️ Filters")
+    genre_filter = st.multiselect("Genres", myfn.get_all_genres(),
+                                  placeholder="Any genre")
+    popularity_filter = st.slider("Minimum popularity", 0.0, 1.0, 0.0, 0.05,
+                                  help="0 = least popular, 1 = most popular in the database")
+    watched_filter = st.multiselect("Already watched", movie_options(myfn.get_data_version()),
+                                    format_func=lambda x: x[1],
+                                    placeholder="Movies to leave out")
+    diversity = st.slider("Diversity", 0.0, 1.0, 0.0, 0.1,
+                          help="Higher values trade similarity for more varied picks "
+                               "(fewer movies from the same director or cast)")
+    
+    warmup_status = warmup_scheduler.status()
+    if warmup_status['state'] == 'running':
+        st.caption(f"⏳ Warming recommendation cache: "
+                   f"{warmup_status['done']}/{warmup_status['total']} movies")
+
+
+# Selecting a movie only reruns this fragment, not the sidebar or the other tab
+@st.fragment
+def recommendation_panel(filters):
+    version = myfn.get_data_version()
+    
+    # Search Box
+    selected_movie = st.selectbox(
+        "Select a movie you love:", 
+        movie_options(version),
+        format_func=lambda x: x[1],
+        placeholder="Type to search..."
+    )
+    
+    if selected_movie:
+        idd = selected_movie[0]
+        
+        # Selected Movie Display
+        col1, col2 = st.columns([1, 2])
+        
+        with col1:
+            st.image(poster_image(idd), use_column_width=True)
+        
+        with col2:
+            st.subheader(myfn.get_movie_title(idd))
+            # Add more details if available (e.g., genres) later
+        
+        st.markdown("---")
+        st.subheader("You might also like:")
+        
+        # Recommendations
+        with st.spinner("Analyzing movie features..."):
+            try:
+                myfn.access_log.record(idd)
+                cards = recommendation_cards(version, idd, **filters)
+                
+                if not cards:
+                    st.warning("No recommendations found.")
+                else:
+                    # Fetch all thumbnails in parallel before rendering
+                    myfn.prefetch_posters([rec_id for rec_id, _, _ in cards])
+                    
+                    # Display as a grid
+                    cols = st.columns(len(cards))
+                    for idx, (rec_id, rec_title, details) in enumerate(cards):
+                        with cols[idx]:
+                            st.markdown(card_html(rec_id, rec_title), unsafe_allow_html=True)
+                            # Tooltip/Expandable for details
+                            with st.expander("Details"):
+                                st.caption(details)
+                                
+            except Exception as e:
+                st.error(f"Error: {str(e)}")
+
+
+@st.fragment
+def new_arrivals_panel():
+    new_movies = new_arrivals_grid(myfn.get_data_version())
+    # Start downloading missing thumbnails before the grid is shown
+    myfn.prefetch_posters([mid for mid, _ in new_movies])
+    
+    # 6 columns grid for new arrivals
+    curr_row = st.columns(6)
+    
+    for i, (mid, title) in enumerate(new_movies):
+        col_idx = i % 6
+        # New row every 6 items
+        if i > 0 and col_idx == 0:
+            curr_row = st.columns(6)
+        
+        with curr_row[col_idx]:
+            st.image(poster_image(mid), use_column_width=True)
+            st.caption(f"**{title}**")
+
 
 # Main Content
-if df is not None:
+# The catalog is loaded once per process, by my_functions
+if myfn.df is not None:
     # Tabs for navigation
     tab1, tab2 = st.tabs(["🔍 Search & Recommend", "🔥 New Arrivals"])
     
@@ -56,82 +225,19 @@ if df is not None:
         st.title(f"{config.APP_ICON} Movie Recommender")
         st.markdown("### Discover your next favorite film")
         
-        # Search Box
-        movie_list = myfn.get_all_movies()
-        selected_movie = st.selectbox(
-            "Select a movie you love:", 
-            movie_list,
-            format_func=lambda x: x[1],
-            placeholder="Type to search..."
-        )
-        
-        if selected_movie:
-            idd = selected_movie[0]
-            
-            # Selected Movie Display
-            col1, col2 = st.columns([1, 2])
-            
-            with col1:
-                poster = myfn.get_movie_poster(idd)
-                st.image(poster, use_column_width=True)
-            
-            with col2:
-                st.subheader(myfn.get_movie_title(idd))
-                # Add more details if available (e.g., genres) later
-            
-            st.markdown("---")
-            st.subheader("You might also like:")
-            
-            # Recommendations
-            with st.spinner("Analyzing movie features..."):
-                try:
-                    recommendations = myfn.get_recommendations(idd)
-                    
-                    if not recommendations:
-                        st.warning("No recommendations found.")
-                    else:
-                        # Display as a grid
-                        cols = st.columns(len(recommendations))
-                        for idx, (rec_text, rec_id) in enumerate(recommendations):
-                            with cols[idx]:
-                                rec_poster = myfn.get_movie_poster(rec_id)
-                                rec_title = rec_text.split('\n')[0].strip() # Extract title
-                                
-                                st.markdown(
-                                    f"""
-                                    <div class="movie-card">
-                                        <img src="{rec_poster}" style="width:100%; border-radius:8px; margin-bottom:10px;">
-                                        <div class="movie-title">{rec_title}</div>
-                                    </div>
-                                    """,
-                                    unsafe_allow_html=True
-                                )
-                                # Tooltip/Expandable for details
-                                with st.expander("Details"):
-                                    st.caption(rec_text.replace(rec_title, "").strip())
-                                    
-                except Exception as e:
-                    st.error(f"Error: {str(e)}")
+        recommendation_panel({
+            'genres': tuple(sorted(genre_filter)),
+            'min_popularity': popularity_filter,
+            'exclude_ids': tuple(sorted(mid for mid, _ in watched_filter)),
+            'mmr_lambda': 1 - diversity if diversity > 0 else None,
+        })
 
     # --- Tab 2: New Arrivals ---
     with tab2:
         st.title("🔥 Just Added")
         st.markdown("### Fresh movies added to our database")
         
-        new_movies = myfn.get_new_arrivals(limit=18)
-        
-        # 6 columns grid for new arrivals
-        curr_row = st.columns(6)
-        
-        for i, (mid, title, poster_url) in enumerate(new_movies):
-            col_idx = i % 6
-            # New row every 6 items
-            if i > 0 and col_idx == 0:
-                curr_row = st.columns(6)
-            
-            with curr_row[col_idx]:
-                st.image(poster_url, use_column_width=True)
-                st.caption(f"**{title}**")
+        new_arrivals_panel()
 
 else:
-    st.error("Failed to load movie database.")
\ No newline at end of file
+    st.error("Failed to load movie database.")
@@ -22,3 +22,42 @@ THEME_COLOR = "#E50914"  # Netflix Red
 # Cache settings
 ENABLE_CACHE = os.getenv("ENABLE_CACHE", "true").lower() == "true"
 MAX_CACHE_SIZE = int(os.getenv("MAX_CACHE_SIZE", "1000"))
+
+# Poster thumbnail cache
+POSTER_CACHE_DIR = os.getenv("POSTER_CACHE_DIR", ".poster_cache")
+POSTER_CACHE_MAX_MB = int(os.getenv("POSTER_CACHE_MAX_MB", "200"))
+POSTER_THUMB_WIDTH = int(os.getenv("POSTER_THUMB_WIDTH", "300"))
+POSTER_FETCH_WORKERS = int(os.getenv("POSTER_FETCH_WORKERS", "4"))
+POSTER_FETCH_TIMEOUT = float(os.getenv("POSTER_FETCH_TIMEOUT", "5"))
+POSTER_RETRY_SECONDS = float(os.getenv("POSTER_RETRY_SECONDS", "300"))  # After a failed download
+
+# Access log used to pick movies for cache warm-up
+ACCESS_LOG_PATH = os.getenv("ACCESS_LOG_PATH", "access_log.json")
+ACCESS_LOG_FLUSH_SECONDS = float(os.getenv("ACCESS_LOG_FLUSH_SECONDS", "30"))
+
+# Background cache warm-up
+ENABLE_WARMUP = os.getenv("ENABLE_WARMUP", "true").lower() == "true"
+WARMUP_TOP_POPULAR = int(os.getenv("WARMUP_TOP_POPULAR", "100"))
+WARMUP_TOP_ACCESSED = int(os.getenv("WARMUP_TOP_ACCESSED", "100"))
+WARMUP_TIME_BUDGET = float(os.getenv("WARMUP_TIME_BUDGET", "300"))  # seconds
+WARMUP_CPU_FRACTION = float(os.getenv("WARMUP_CPU_FRACTION", "0.5"))
+
+# Diversity re-ranking (maximal marginal relevance)
+MMR_POOL_SIZE = int(os.getenv("MMR_POOL_SIZE", "50"))
+MMR_TIME_BUDGET_MS = float(os.getenv("MMR_TIME_BUDGET_MS", "50"))
+
+# Incremental metadata refresh (add_movies.py --refresh)
+MOVIE_DELTA_PATH = os.getenv("MOVIE_DELTA_PATH", "movie_data_delta.csv")
+REFRESH_STATE_PATH = os.getenv("REFRESH_STATE_PATH", "refresh_state.json")
+REFRESH_WORKERS = int(os.getenv("REFRESH_WORKERS", "8"))
+
+# Load MOVIE_DATA_PATH when my_functions is imported. Set to false on shard
+# nodes, which load only their shard with my_functions.reload_data.
+LOAD_DATA_ON_IMPORT = os.getenv("LOAD_DATA_ON_IMPORT", "true").lower() == "true"
+
+# Sharded deployment (sharding.py)
+# Shared secret between router and shards, required: shards unpickle what they
+# receive, so anyone who can connect with the key can run code on them
+SHARD_AUTHKEY = os.getenv("SHARD_AUTHKEY")
+SHARD_TIMEOUT = float(os.getenv("SHARD_TIMEOUT", "5"))
+SHARD_ROUTER_WORKERS = int(os.getenv("SHARD_ROUTER_WORKERS", "16"))
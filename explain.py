@@ -0,0 +1,128 @@
+"""
+Explain a recommendation query for the Movie Recommendation System.
+
+Runs the recommendation pipeline for one movie, stage by stage and without
+the cache, and prints:
+1. How long each stage took (load, candidate generation, scoring, selection, formatting)
+2. The per-feature distances (genre, actor, director, popularity) of every result
+3. Optionally a cProfile dump of the query, for snakeviz or flameprof
+
+Usage:
+    python explain.py --id 155
+    python explain.py --id 155 -k 10 --genre Comedy --min-popularity 0.2
+    python explain.py --id 155 --profile query.prof
+"""
+
+import argparse
+import cProfile
+import sys
+import time
+
+import config
+
+FEATURES = ['genre', 'actor', 'director', 'popularity']
+
+
+def load():
+    """Import my_functions, which loads and prepares the movie data.
+
+    Returns:
+        Tuple of (my_functions module, seconds spent loading)
+    """
+    start = time.perf_counter()
+    import my_functions as myfn
+    return myfn, time.perf_counter() - start
+
+
+def explain_query(myfn, movie_id, k, genres=(), min_popularity=None, exclude_ids=(),
+                  mmr_lambda=None):
+    """Run one query through the same stages as get_recommendations, timing each.
+
+    Returns:
+        Dict with 'timings' (list of (stage, seconds)), 'candidates' (count) and
+        'results' (list of dicts with rank, id, title, distance and per-feature distances)
+    """
+    timings = []
+
+    def timed(stage, func, *args):
+        start = time.perf_counter()
+        result = func(*args)
+        timings.append((stage, time.perf_counter() - start))
+        return result
+
+    candidates = timed("candidates", myfn._candidate_ids, movie_id, tuple(genres),
+                       min_popularity, tuple(exclude_ids))
+    distances = timed("scoring", myfn._score_candidates, movie_id, candidates)
+    selected = timed("selection", myfn._select_top, distances, k, mmr_lambda)
+    timed("formatting", myfn._format_recommendations, selected)
+
+    results = []
+    for rank, (title, dist, idd) in enumerate(selected, start=1):
+        parts = myfn.compute_dist_components(myfn.df, idd, myfn.df, movie_id) or {}
+        results.append({'rank': rank, 'id': idd, 'title': title, 'distance': dist, **parts})
+
+    return {'timings': timings, 'candidates': len(candidates), 'results': results}
+
+
+def print_report(title, load_seconds, report):
+    """Print the timing breakdown and the per-feature distances."""
+    timings = [("load", load_seconds)] + report['timings']
+    query_total = sum(seconds for _, seconds in report['timings'])
+
+    print(f"🎬 {title}")
+    print(f"   {report['candidates']} candidates scored\n")
+
+    print("⏱️  Stage timings")
+    for stage, seconds in timings:
+        share = f"{seconds / query_total:6.1%}" if stage != "load" and query_total else "      "
+        print(f"   {stage:<12} {seconds * 1000:10.2f} ms  {share}")
+    print(f"   {'query total':<12} {query_total * 1000:10.2f} ms\n")
+
+    print("📏 Distance contributions (lower = more similar)")
+    header = f"   {'#':>2}  {'id':>8}  {'title':<30} {'total':>7}"
+    header += "".join(f" {feature:>10}" for feature in FEATURES)
+    print(header)
+    for row in report['results']:
+        line = f"   {row['rank']:>2}  {row['id']:>8}  {str(row['title'])[:30]:<30} {row['distance']:7.3f}"
+        line += "".join(f" {row.get(feature, float('nan')):10.3f}" for feature in FEATURES)
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Explain and profile the recommendations for a movie")
+    parser.add_argument("--id", "-i", type=int, required=True, help="Movie ID to get recommendations for")
+    parser.add_argument("-k", type=int, default=config.NUM_RECOMMENDATIONS,
+                        help="Number of recommendations")
+    parser.add_argument("--genre", "-g", action="append", default=[],
+                        help="Only recommend this genre (repeatable)")
+    parser.add_argument("--min-popularity", type=float, help="Minimum normalized popularity (0-1)")
+    parser.add_argument("--exclude", type=int, action="append", default=[],
+                        help="Movie ID to leave out (repeatable)")
+    parser.add_argument("--mmr-lambda", type=float, help="Re-rank for diversity with this lambda")
+    parser.add_argument("--profile", "-p", help="Write a cProfile dump of the query to this file")
+
+    args = parser.parse_args()
+
+    myfn, load_seconds = load()
+    if args.id not in myfn.df.index:
+        print(f"❌ Movie ID not found: {args.id}")
+        sys.exit(1)
+
+    query = dict(genres=args.genre, min_popularity=args.min_popularity,
+                 exclude_ids=args.exclude, mmr_lambda=args.mmr_lambda)
+
+    if args.profile:
+        profiler = cProfile.Profile()
+        report = profiler.runcall(explain_query, myfn, args.id, args.k, **query)
+        profiler.dump_stats(args.profile)
+    else:
+        report = explain_query(myfn, args.id, args.k, **query)
+
+    print_report(myfn.get_movie_title(args.id), load_seconds, report)
+
+    if args.profile:
+        print(f"\n💾 Profile written to {args.profile} (view with `snakeviz` or `flameprof`)")
+
+
+if __name__ == "__main__":
+    main()
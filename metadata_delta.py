@@ -0,0 +1,187 @@
+"""
+Metadata delta files for the Movie Recommendation System.
+
+Refreshed TMDB metadata (popularity, poster, credits) is written to a small
+delta CSV next to the catalog instead of rewriting `movie_data.csv`. The
+delta is applied on top of the catalog when it is loaded, and folded into the
+catalog by `add_movies.py --rebuild`.
+
+The delta holds credits as names only. When it is applied, they are encoded
+against the catalog's own vocabulary, which is read back from the catalog's
+binary vectors: catalogs are not always encoded in one known order (the data
+preparation notebook uses set order).
+"""
+import os
+from ast import literal_eval
+from typing import Dict, NamedTuple
+
+import numpy as np
+import pandas as pd
+
+# Columns a delta may update, in file order
+DELTA_COLUMNS = ['popularity', 'posters', 'Top actor list', 'Director list']
+LIST_COLUMNS = ['Top actor list', 'Director list']
+# Binary vector column encoding each list column
+BIN_COLUMNS = {'Top actor list': 'Actors bin', 'Director list': 'Director bin'}
+
+
+class Vocabulary(NamedTuple):
+    """Positions of names in a catalog's binary vectors."""
+    positions: Dict[str, int]
+    size: int  # Length of the vectors
+
+    def encode(self, names):
+        """Binary vector for names; names the catalog does not know stay 0."""
+        vector = [0] * self.size
+        for name in names:
+            if name in self.positions:
+                vector[self.positions[name]] = 1
+        return vector
+
+
+def catalog_vocabulary(rows):
+    """Recover which name every position of a catalog's binary vectors stands for.
+
+    A name's position is the one set in the vectors of all movies that list
+    it. Names that only ever appear together are interchangeable for the
+    catalog, and get their positions in name order.
+
+    Args:
+        rows: Iterable of (names, binary vector) pairs, parsed
+
+    Returns:
+        Vocabulary
+    """
+    candidates = {}
+    size = 0
+    for names, vector in rows:
+        size = max(size, len(vector))
+        ones = set(np.flatnonzero(vector).tolist())
+        for name in names:
+            candidates[name] = candidates[name] & ones if name in candidates else set(ones)
+
+    positions = {}
+    taken = set()
+    pending = candidates
+    while pending:
+        unresolved = {}
+        for name, options in pending.items():
+            options = options - taken
+            if len(options) == 1:
+                positions[name] = options.pop()
+                taken.add(positions[name])
+            elif options:
+                unresolved[name] = options
+            # No options left: the name is not encoded in the catalog
+        if unresolved and len(unresolved) == len(pending):
+            # Only names that always appear together are left, pin the first one
+            name = min(unresolved)
+            positions[name] = min(unresolved.pop(name))
+            taken.add(positions[name])
+        pending = unresolved
+    return Vocabulary(positions, size)
+
+
+def catalog_vocabularies(dataframe):
+    """Vocabulary of every list column in BIN_COLUMNS, from a parsed catalog."""
+    return {col: catalog_vocabulary(zip(dataframe[col], dataframe[bin_col]))
+            for col, bin_col in BIN_COLUMNS.items()}
+
+
+def read_delta(path):
+    """Read a delta file.
+
+    Args:
+        path: Delta CSV path
+
+    Returns:
+        DataFrame indexed by movie id with parsed list columns, or None if there is no delta
+    """
+    if not path or not os.path.exists(path):
+        return None
+    delta = pd.read_csv(path, index_col='id')
+    delta = delta[[col for col in DELTA_COLUMNS if col in delta.columns]]
+    for col in LIST_COLUMNS:
+        delta[col] = delta[col].apply(lambda x: literal_eval(x) if isinstance(x, str) else x)
+    delta['posters'] = delta['posters'].fillna('')
+    return delta
+
+
+def write_delta(path, rows):
+    """Merge updated rows into the delta file, newer values winning.
+
+    Args:
+        path: Delta CSV path
+        rows: List of dicts with an 'id' key and the DELTA_COLUMNS
+
+    Returns:
+        Number of movies in the delta file after the merge
+    """
+    updates = pd.DataFrame(rows, columns=['id'] + DELTA_COLUMNS).set_index('id')
+    existing = read_delta(path)
+    if existing is not None:
+        updates = pd.concat([existing[~existing.index.isin(updates.index)], updates])
+
+    tmp_path = f"{path}.tmp"
+    updates.to_csv(tmp_path)
+    os.replace(tmp_path, path)
+    return len(updates)
+
+
+def apply_delta(dataframe, delta, popularity_column='popularity', vocabularies=None,
+                encode=True):
+    """Overwrite catalog columns with the delta values for movies in the catalog.
+
+    The binary vectors of refreshed credits are encoded with the catalog's
+    vocabulary. If none of a movie's refreshed names is in the vocabulary,
+    its current credits are kept: an all-zero vector has no defined distance.
+    They are picked up by `add_movies.py --rebuild`, which extends the vocabulary.
+
+    Args:
+        dataframe: Catalog DataFrame with parsed list columns, updated in place
+        delta: DataFrame from read_delta
+        popularity_column: Catalog column that holds the raw TMDB popularity
+        vocabularies: Result of catalog_vocabularies for the whole catalog
+            (default computed from dataframe)
+        encode: Set to False to leave the binary vectors alone, e.g. when all
+            of them are rebuilt afterwards
+
+    Returns:
+        Number of catalog movies updated
+    """
+    delta = delta[delta.index.isin(dataframe.index)]
+    if delta.empty:
+        return 0
+
+    dataframe.loc[delta.index, popularity_column] = delta['popularity'].astype(float)
+    # Assign whole columns: .loc cannot store lists into single cells
+    _update_column(dataframe, 'posters', delta['posters'].to_dict())
+    if not encode:
+        for col in LIST_COLUMNS:
+            _update_column(dataframe, col, delta[col].to_dict())
+        return len(delta)
+
+    if vocabularies is None:
+        vocabularies = catalog_vocabularies(dataframe)
+    for col, bin_col in BIN_COLUMNS.items():
+        names = {}
+        vectors = {}
+        current = dataframe[bin_col]
+        for movie_id, movie_names in delta[col].items():
+            vector = vocabularies[col].encode(movie_names)
+            if any(vector) or not _any_set(current[movie_id]):
+                names[movie_id] = movie_names
+                vectors[movie_id] = vector
+        _update_column(dataframe, col, names)
+        _update_column(dataframe, bin_col, vectors)
+    return len(delta)
+
+
+def _update_column(dataframe, col, updates):
+    dataframe[col] = [updates.get(i, v) for i, v in zip(dataframe.index, dataframe[col])]
+
+
+def _any_set(vector):
+    if isinstance(vector, str):
+        vector = literal_eval(vector)
+    return any(vector)
@@ -1,21 +1,240 @@
+import math
 import numpy as np
 import pandas as pd
-import operator
+import os
+import threading
+import time
 from scipy import spatial
 from ast import literal_eval as eval
 from functools import lru_cache
 import config
+import metadata_delta
+import poster_cache
+from access_log import AccessLog
 
-# Load data once at module level
-df = pd.read_csv(config.MOVIE_DATA_PATH, index_col='id')
 
-# Normalize popularity to [0, 1] range to prevent it from dominating the distance metric
-# (Cosine distance is 0-1, but absolute popularity diff was huge for new movies)
-if 'popularity' in df.columns:
-    df['popularity'] = (df['popularity'] - df['popularity'].min()) / (df['popularity'].max() - df['popularity'].min())
+def load_data(path=None, delta_path=None, popularity_range=None):
+    """Read the movie CSV and prepare it for recommendations.
+    
+    Args:
+        path: CSV file to read (default from config)
+        delta_path: Metadata delta to apply on top (default from config when
+            reading the default CSV)
+        popularity_range: (min, max) raw popularity to normalize with (default
+            the range of the file)
+        
+    Returns:
+        DataFrame indexed by movie id with parsed list columns
+    """
+    dataframe = pd.read_csv(path or config.MOVIE_DATA_PATH, index_col='id')
+    
+    for i in ['Genre list', 'Top actor list', 'Director list', 'Genres bin', 'Actors bin', 'Director bin']:
+        dataframe[i] = dataframe[i].apply(lambda x: eval(x))
+    
+    if 'popularity' in dataframe.columns:
+        # Keep TMDB's value so popularity can be normalized again after a refresh
+        dataframe['raw popularity'] = dataframe['popularity'].astype(float)
+        
+        delta = metadata_delta.read_delta(_delta_path(path, delta_path))
+        if delta is not None:
+            metadata_delta.apply_delta(dataframe, delta, popularity_column='raw popularity')
+        
+        _normalize_popularity(dataframe, popularity_range)
+    
+    return dataframe
+
+
+def _delta_path(path, delta_path):
+    # A delta belongs to the configured catalog, not to arbitrary CSV files
+    if delta_path is None and path is None:
+        return config.MOVIE_DELTA_PATH
+    return delta_path
+
+
+def _normalize_popularity(dataframe, popularity_range=None):
+    """Normalize raw popularity to [0, 1] range to prevent it from dominating the distance metric.
+    
+    (Cosine distance is 0-1, but absolute popularity diff was huge for new movies)
+    """
+    raw = dataframe['raw popularity']
+    # A shard only holds part of the catalog, so it is given the catalog-wide range
+    low, high = popularity_range or (raw.min(), raw.max())
+    dataframe['popularity'] = (raw - low) / (high - low)
+
+
+POPULARITY_BUCKETS = 10
+
+
+def _build_filter_masks(dataframe):
+    """Precompute per-genre and per-popularity-bucket bitmaps over the dataframe rows.
+    
+    Returns:
+        Tuple of (genre -> mask dict, row positions per bucket, "bucket >= b" masks)
+    """
+    genre_masks = {}
+    for row, genre_list in enumerate(dataframe['Genre list']):
+        for genre in genre_list:
+            if genre not in genre_masks:
+                genre_masks[genre] = np.zeros(len(dataframe), dtype=bool)
+            genre_masks[genre][row] = True
+    
+    popularity = dataframe['popularity'].values.astype(float)
+    buckets = np.clip(np.floor(np.nan_to_num(popularity, nan=-1.0) * POPULARITY_BUCKETS),
+                      -1, POPULARITY_BUCKETS - 1)
+    bucket_rows = [np.flatnonzero(buckets == b) for b in range(POPULARITY_BUCKETS)]
+    # One extra (empty) entry so the bucket above the top one can be looked up
+    at_least = [buckets >= b for b in range(POPULARITY_BUCKETS + 1)]
+    
+    return genre_masks, bucket_rows, at_least
+
+
+def _file_version(path):
+    """Identify the contents of a data file by its modification time and size."""
+    stat = os.stat(path)
+    return f"{stat.st_mtime_ns:x}-{stat.st_size:x}"
+
+
+def _data_version(path=None, delta_path=None):
+    """Version of the catalog file combined with that of its metadata delta."""
+    version = _file_version(path or config.MOVIE_DATA_PATH)
+    delta_path = _delta_path(path, delta_path)
+    if delta_path and os.path.exists(delta_path):
+        version += '+' + _file_version(delta_path)
+    return version
+
+
+def _delta_version(delta_path):
+    if delta_path and os.path.exists(delta_path):
+        return _file_version(delta_path)
+    return None
+
+
+# Load data once at module level, unless the process loads its own with reload_data
+if config.LOAD_DATA_ON_IMPORT:
+    df = load_data()
+    data_version = _data_version()
+    _applied_delta_version = _delta_version(config.MOVIE_DELTA_PATH)
+    _genre_masks, _popularity_bucket_rows, _popularity_at_least = _build_filter_masks(df)
+else:
+    df = None
+    data_version = None
+    _applied_delta_version = None
+    _genre_masks, _popularity_bucket_rows, _popularity_at_least = {}, [], []
+_popularity_range = None
+_delta_lock = threading.Lock()
+
+# Bumped whenever df is replaced; part of the cache key, so a computation that
+# was still running on the old data can never be served for the new data
+_data_generation = 0
+_swap_lock = threading.Lock()
+
+# Callbacks run after the data changed, e.g. to warm the recommendation cache again
+_reload_callbacks = []
+
+# Which movies users ask about, persisted so cache warm-up can use it after a restart
+access_log = AccessLog()
+
+
+def reload_data(path=None, delta_path=None, popularity_range=None):
+    """Reload the movie data from disk and drop cached recommendations.
+    
+    Also the explicit load step for processes that import this module with
+    config.LOAD_DATA_ON_IMPORT off, such as shard servers.
+    
+    Args:
+        path: CSV file to read (default from config)
+        delta_path: Metadata delta to apply on top ('' for none, default from
+            config when reading the default CSV)
+        popularity_range: (min, max) raw popularity to normalize with, kept for
+            later metadata deltas (default the range of the file)
+    """
+    global _applied_delta_version, _popularity_range
+    
+    new_df = load_data(path, delta_path, popularity_range)
+    _popularity_range = popularity_range
+    _swap_data(new_df, _data_version(path, delta_path))
+    _applied_delta_version = _delta_version(_delta_path(path, delta_path))
+
+
+def apply_metadata_delta(delta_path=None):
+    """Apply a metadata delta to the loaded data without reloading the catalog.
+    
+    Updates popularity, posters and credits of the movies in the delta on a
+    copy of the data, normalizes popularity again and swaps the copy in, so
+    requests being served never see a half-applied delta.
+    
+    Args:
+        delta_path: Delta CSV to apply (default from config)
+        
+    Returns:
+        Number of movies updated
+    """
+    global _applied_delta_version
+    
+    delta_path = delta_path or config.MOVIE_DELTA_PATH
+    with _delta_lock:
+        version = _delta_version(delta_path)
+        delta = metadata_delta.read_delta(delta_path)
+        if delta is None:
+            return 0
+        
+        new_df = df.copy()
+        updated = metadata_delta.apply_delta(new_df, delta, popularity_column='raw popularity')
+        _applied_delta_version = version
+        if updated:
+            _normalize_popularity(new_df, _popularity_range)
+            _swap_data(new_df, _data_version(delta_path=delta_path))
+    return updated
+
+
+def sync_metadata_delta():
+    """Apply the configured metadata delta if it changed since it was last applied.
+    
+    Cheap enough to call on every page load: it only checks the file's
+    modification time and size.
+    
+    Returns:
+        Number of movies updated
+    """
+    if _delta_version(config.MOVIE_DELTA_PATH) in (None, _applied_delta_version):
+        return 0
+    return apply_metadata_delta()
+
+
+def _swap_data(new_df, version):
+    """Make new_df the served data, then drop results cached for the old data.
+    
+    Everything derived from the data is built before anything is replaced. The
+    generation is bumped last, so a computation that read the new generation
+    also reads the new data.
+    """
+    global df, data_version, _data_generation
+    global _genre_masks, _popularity_bucket_rows, _popularity_at_least
+    
+    masks = _build_filter_masks(new_df)
+    with _swap_lock:
+        df = new_df
+        _genre_masks, _popularity_bucket_rows, _popularity_at_least = masks
+        data_version = version
+        _data_generation += 1
+    get_recommendations_cached.cache_clear()
+    
+    for callback in _reload_callbacks:
+        callback()
+
+
+def get_data_version():
+    """Get an identifier that changes whenever the movie data is reloaded with new contents.
+    
+    Returns:
+        Version string, usable as a cache key for views derived from the data
+    """
+    return data_version
+
 
-for i in ['Genre list', 'Top actor list', 'Director list', 'Genres bin', 'Actors bin', 'Director bin']:
-    df[i] = df[i].apply(lambda x: eval(x))
+def on_reload(callback):
+    """Register a function to call (without arguments) after the data changed."""
+    _reload_callbacks.append(callback)
 
 
 def create_movie_dict(dataframe, index):
@@ -41,89 +260,330 @@ def create_movie_dict(dataframe, index):
         return None
 
 
-def compute_dist(df1, ind1, df2, ind2):
-    """Computes the distance between 2 movies based on cosine distance.
+def compute_dist_components(df1, ind1, df2, ind2):
+    """Computes the per-feature distances between 2 movies.
     
     Args:
         df1, df2: DataFrames containing movie data
         ind1, ind2: Indices of the movies to compare
         
     Returns:
-        Combined distance score (lower = more similar)
+        Dict with 'genre', 'actor', 'director' and 'popularity' distances,
+        or None if either movie is invalid
     """
     mov1 = create_movie_dict(df1, ind1)
     mov2 = create_movie_dict(df2, ind2)
     
     if mov1 is None or mov2 is None:
-        return float('inf')  # Return high distance for invalid movies
+        return None
     
-    genre_distance = spatial.distance.cosine(mov1[1], mov2[1])
-    actor_distance = spatial.distance.cosine(mov1[2], mov2[2])
-    dir_distance = spatial.distance.cosine(mov1[3], mov2[3])
-    popularity_distance = abs(mov1[4] - mov2[4])
+    return {
+        'genre': spatial.distance.cosine(mov1[1], mov2[1]),
+        'actor': spatial.distance.cosine(mov1[2], mov2[2]),
+        'director': spatial.distance.cosine(mov1[3], mov2[3]),
+        'popularity': abs(mov1[4] - mov2[4]),
+    }
+
+
+def compute_dist(df1, ind1, df2, ind2):
+    """Computes the distance between 2 movies based on cosine distance.
     
-    return genre_distance + popularity_distance + actor_distance + dir_distance
+    Args:
+        df1, df2: DataFrames containing movie data
+        ind1, ind2: Indices of the movies to compare
+        
+    Returns:
+        Combined distance score (lower = more similar)
+    """
+    parts = compute_dist_components(df1, ind1, df2, ind2)
+    
+    if parts is None:
+        return float('inf')  # Return high distance for invalid movies
+    
+    return parts['genre'] + parts['popularity'] + parts['actor'] + parts['director']
 
 
 # Cache recommendations to avoid recomputation
 @lru_cache(maxsize=config.MAX_CACHE_SIZE)
-def get_recommendations_cached(movie_id, k=5):
-    """Cached version of get_recommendations for better performance."""
-    return _compute_recommendations(movie_id, k)
+def get_recommendations_cached(generation, movie_id, k=5, genres=(), min_popularity=None,
+                               exclude_ids=(), mmr_lambda=None):
+    """Cached version of get_recommendations for better performance.
+    
+    Filter arguments must be hashable (tuples) as they are part of the cache key.
+    `generation` is the data generation the result is computed for.
+    """
+    return _compute_recommendations(movie_id, k, genres, min_popularity, exclude_ids, mmr_lambda)
 
 
-def _compute_recommendations(movie_id, k):
+def _candidate_ids(movie_id, genres=(), min_popularity=None, exclude_ids=(), require_movie=True):
+    """Select the movies that may be recommended, using the precomputed bitmaps.
+    
+    Args:
+        movie_id: The movie index recommendations are computed for
+        genres: Keep movies having at least one of these genres
+        min_popularity: Keep movies with normalized popularity >= this value
+        exclude_ids: Movie indices that must not be recommended
+        require_movie: Raise KeyError if movie_id is not in the data (a shard
+            scores movies against a query movie held by another shard)
+        
+    Returns:
+        Index of candidate movie ids, in dataset order
+    """
+    if require_movie and movie_id not in df.index:
+        raise KeyError(movie_id)
+    
+    mask = df.index != movie_id
+    
+    if genres:
+        genre_mask = np.zeros(len(df), dtype=bool)
+        for genre in genres:
+            if genre in _genre_masks:
+                genre_mask |= _genre_masks[genre]
+        mask &= genre_mask
+    
+    if min_popularity is not None:
+        mask &= _popularity_mask(min_popularity)
+    
+    if exclude_ids:
+        mask &= ~df.index.isin(list(exclude_ids))
+    
+    return df.index[mask]
+
+
+def _popularity_mask(min_popularity):
+    """Bitmap of movies with normalized popularity >= min_popularity.
+    
+    Buckets strictly above the threshold are taken whole; only the bucket
+    containing the threshold is checked movie by movie.
+    """
+    bucket = int(min(max(min_popularity, 0.0), 1.0) * POPULARITY_BUCKETS)
+    bucket = min(bucket, POPULARITY_BUCKETS - 1)
+    mask = _popularity_at_least[bucket + 1].copy()
+    rows = _popularity_bucket_rows[bucket]
+    mask[rows] = df['popularity'].values[rows] >= min_popularity
+    return mask
+
+
+def _compute_recommendations(movie_id, k, genres=(), min_popularity=None, exclude_ids=(),
+                             mmr_lambda=None):
     """Internal function to compute recommendations."""
+    candidates = _candidate_ids(movie_id, genres, min_popularity, exclude_ids)
+    distances = _score_candidates(movie_id, candidates)
+    selected = _select_top(distances, k, mmr_lambda)
+    return _format_recommendations(selected)
+
+
+def _score_candidates(movie_id, candidates, query_df=None):
+    """Distance of every candidate to the movie: (title, distance, id) tuples.
+    
+    The movie's features are read from query_df if given, otherwise from df.
+    """
+    if query_df is None:
+        query_df = df
     distances = []
-    training = df.drop(movie_id, axis=0)
-    train_movie_dict = dict(zip(training.index, training['title']))
+    for key in candidates:
+        dist = compute_dist(df, key, query_df, movie_id)
+        distances.append((df['title'][key], dist, key))
+    return distances
+
+
+def _select_top(distances, k, mmr_lambda=None):
+    """Pick the k closest candidates, re-ranked for diversity if mmr_lambda is set."""
+    distances = sorted(distances, key=lambda d: _sortable_distance(d[1]))
+    
+    if mmr_lambda is not None:
+        distances = _mmr_rerank(distances[:max(k, config.MMR_POOL_SIZE)], k, mmr_lambda)
     
-    for key, value in train_movie_dict.items():
-        dist = compute_dist(training, key, df, movie_id)
-        distances.append((value, dist, key))
+    return distances[:k]
+
+
+def _sortable_distance(dist):
+    """Distance to sort by: undefined (NaN) distances sort last, like infinite ones.
+    
+    Cosine distance is NaN when a movie has an all-zero vector, e.g. no known
+    actors. NaN compares false with everything, so sorting it as is would
+    leave the order up to where it happens to be in the list.
+    """
+    return math.inf if math.isnan(dist) else dist
+
+
+def _format_recommendations(selected):
+    """Turn (title, distance, id) tuples into (recommendation_text, movie_id) tuples."""
+    return [(_format_recommendation(name, idd), idd) for name, _, idd in selected]
+
+
+def _format_recommendation(name, idd):
+    """Build the text shown for a recommended movie."""
+    # Safely get movie details with defaults
+    genre_list = df['Genre list'].get(idd, [])
+    actor_list = df['Top actor list'].get(idd, [])
+    director_list = df['Director list'].get(idd, [])
+    
+    return str(
+        name + ' \n\t ' + 
+        " Genre: " + str(genre_list).strip('[]').replace(' ', '') +
+        ' \n\t ' + " Actors: " + str(actor_list).strip('[]') + 
+        ' \n\t ' + " Director(s): " + str(director_list).strip('[]')
+    )
+
+
+def pairwise_similarity(ids):
+    """Similarity between every pair of the given movies, as one matrix operation.
     
-    distances.sort(key=operator.itemgetter(1))
+    Uses the same four features as compute_dist: the cosine similarity of the
+    genre, actor and director vectors and the popularity closeness, averaged
+    so that similarity = 1 - distance / 4.
     
-    recommendation_list = []
-    for i in range(min(k, len(distances))):  # Handle edge case
-        name = distances[i][0]
-        idd = distances[i][2]
+    Args:
+        ids: Movie indices
         
-        # Safely get movie details with defaults
-        genre_list = df['Genre list'].get(idd, [])
-        actor_list = df['Top actor list'].get(idd, [])
-        director_list = df['Director list'].get(idd, [])
+    Returns:
+        Symmetric (len(ids), len(ids)) numpy array with values in [0, 1]
+    """
+    rows = df.loc[list(ids)]
+    similarity = np.zeros((len(rows), len(rows)))
+    
+    for col in ['Genres bin', 'Actors bin', 'Director bin']:
+        vectors = np.array(rows[col].tolist(), dtype=float)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        # Movies without any known entity are not similar to anything
+        vectors = np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+        similarity += vectors @ vectors.T
+    
+    popularity = rows['popularity'].values.astype(float)
+    similarity += 1 - np.abs(popularity[:, None] - popularity[None, :])
+    
+    return np.nan_to_num(similarity / 4)
+
+
+def _mmr_rerank(distances, k, mmr_lambda):
+    """Pick k diverse movies from a candidate pool with maximal marginal relevance.
+    
+    Each step picks the movie maximizing
+    mmr_lambda * relevance - (1 - mmr_lambda) * (max similarity to movies already picked).
+    If the time budget runs out, the rest is filled in relevance order.
+    
+    Args:
+        distances: (title, distance, id) tuples sorted by distance
+        k: Number of movies to pick
+        mmr_lambda: Weight of relevance against diversity, between 0 and 1
         
-        recommendation_list.append((
-            str(
-                name + ' \n\t ' + 
-                " Genre: " + str(genre_list).strip('[]').replace(' ', '') +
-                ' \n\t ' + " Actors: " + str(actor_list).strip('[]') + 
-                ' \n\t ' + " Director(s): " + str(director_list).strip('[]')
-            ),
-            idd
-        ))
+    Returns:
+        The picked (title, distance, id) tuples in selection order
+    """
+    deadline = time.perf_counter() + config.MMR_TIME_BUDGET_MS / 1000
+    k = min(k, len(distances))
+    if k == 0:
+        return []
+    
+    relevance = np.nan_to_num(1 - np.array([d[1] for d in distances], dtype=float) / 4,
+                              nan=0.0, posinf=0.0, neginf=0.0)
+    similarity = pairwise_similarity([d[2] for d in distances])
+    
+    picked = []
+    available = np.ones(len(distances), dtype=bool)
+    max_similarity = np.zeros(len(distances))
     
-    return recommendation_list
+    while len(picked) < k:
+        if time.perf_counter() > deadline:
+            # Out of time: keep the picks so far, fill up by relevance
+            picked += list(np.flatnonzero(available)[:k - len(picked)])
+            break
+        scores = mmr_lambda * relevance - (1 - mmr_lambda) * max_similarity
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        picked.append(best)
+        available[best] = False
+        max_similarity = np.maximum(max_similarity, similarity[best])
+    
+    return [distances[i] for i in picked]
 
 
-def get_recommendations(ID, K=None):
+def get_recommendations(ID, K=None, genres=None, min_popularity=None, exclude_ids=None,
+                        mmr_lambda=None, record_access=True):
     """Get movie recommendations based on similarity.
     
+    Filters are applied before scoring, so up to K matching movies are
+    returned in a single pass.
+    
     Args:
         ID: The movie index to get recommendations for
         K: Number of recommendations (default from config)
+        genres: Only recommend movies with at least one of these genres
+        min_popularity: Only recommend movies with normalized popularity (0-1) at or above this
+        exclude_ids: Movie indices to leave out (e.g. already watched)
+        mmr_lambda: Re-rank for diversity with maximal marginal relevance; 1 keeps
+            the plain similarity order, lower values favour more varied results
+        record_access: Count this request in the access log (disable when the
+            caller keeps its own cache and records requests itself)
         
     Returns:
         List of tuples: (recommendation_text, movie_id)
     """
     if K is None:
         K = config.NUM_RECOMMENDATIONS
-        
+    
+    # Normalize filters so equivalent requests share a cache entry
+    genres = tuple(sorted(set(genres))) if genres else ()
+    exclude_ids = tuple(sorted(set(exclude_ids))) if exclude_ids else ()
+    if min_popularity is not None and min_popularity <= 0:
+        min_popularity = None
+    if mmr_lambda is not None and mmr_lambda >= 1:
+        mmr_lambda = None
+    elif mmr_lambda is not None:
+        mmr_lambda = float(max(mmr_lambda, 0.0))
+    
+    if record_access:
+        access_log.record(ID)
+    return _get_recommendations(ID, K, genres, min_popularity, exclude_ids, mmr_lambda)
+
+
+def precompute_recommendations(ID, K=None):
+    """Fill the cache with the unfiltered recommendations for a movie.
+    
+    Unlike get_recommendations, this is not counted in the access log.
+    
+    Args:
+        ID: The movie index to get recommendations for
+        K: Number of recommendations (default from config)
+    """
+    if K is None:
+        K = config.NUM_RECOMMENDATIONS
+    _get_recommendations(ID, K, (), None, (), None)
+
+
+def _get_recommendations(ID, K, genres, min_popularity, exclude_ids, mmr_lambda):
+    """Serve normalized arguments from the cache when it is enabled."""
+    generation = _data_generation
+    try:
+        result = _get_recommendations_for(generation, ID, K, genres, min_popularity, exclude_ids, mmr_lambda)
+    except Exception:
+        if generation == _data_generation:
+            raise
+        result = None  # Failed because the data was swapped mid-way
+    
+    if generation != _data_generation:
+        # The data was swapped while computing, the result may mix old and new data
+        result = _get_recommendations_for(_data_generation, ID, K, genres, min_popularity,
+                                          exclude_ids, mmr_lambda)
+    return result
+
+
+def _get_recommendations_for(generation, ID, K, genres, min_popularity, exclude_ids, mmr_lambda):
     if config.ENABLE_CACHE:
-        return list(get_recommendations_cached(ID, K))
+        return list(get_recommendations_cached(generation, ID, K, genres, min_popularity,
+                                               exclude_ids, mmr_lambda))
     else:
-        return _compute_recommendations(ID, K)
+        return _compute_recommendations(ID, K, genres, min_popularity, exclude_ids, mmr_lambda)
+
+
+def get_all_genres():
+    """Get the sorted list of genres that can be used as a filter.
+    
+    Returns:
+        List of genre names
+    """
+    return sorted(_genre_masks)
 
 
 def get_movie_poster(movie_id):
@@ -144,6 +604,45 @@ def get_movie_poster(movie_id):
     return config.DEFAULT_POSTER_URL
 
 
+def get_movie_thumbnail(movie_id):
+    """Get a locally cached poster thumbnail without waiting for downloads.
+    
+    On a miss the download is started in the background and the placeholder
+    is returned, so the thumbnail shows up on a later render.
+    
+    Args:
+        movie_id: The movie index
+        
+    Returns:
+        Path to the thumbnail on disk, or default placeholder URL
+    """
+    poster = get_movie_poster(movie_id)
+    if poster == config.DEFAULT_POSTER_URL:
+        return poster
+    try:
+        cache = poster_cache.get_poster_cache()
+        path = cache.get(poster)
+        if path is None:
+            cache.prefetch([poster])
+    except OSError:
+        path = None  # E.g. POSTER_CACHE_DIR cannot be created
+    return path or config.DEFAULT_POSTER_URL
+
+
+def prefetch_posters(movie_ids):
+    """Start background downloads of poster thumbnails ahead of display.
+    
+    Args:
+        movie_ids: Iterable of movie indices
+    """
+    urls = [get_movie_poster(i) for i in movie_ids]
+    urls = [u for u in urls if u != config.DEFAULT_POSTER_URL]
+    try:
+        poster_cache.get_poster_cache().prefetch(urls)
+    except OSError:
+        pass  # Without a usable cache every poster shows the placeholder
+
+
 def get_movie_title(movie_id):
     """Safely get movie title.
     
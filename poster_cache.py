@@ -0,0 +1,248 @@
+"""
+Poster thumbnail cache for the Movie Recommendation System.
+
+Posters are stored on TMDB at their `original` size, which can be several
+megabytes each. This module downloads them in the background with a bounded
+worker pool, resizes them to small JPEG thumbnails and keeps those on disk
+with least-recently-used eviction, so the app can serve a local copy.
+"""
+import base64
+import hashlib
+import io
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from PIL import Image
+
+import config
+
+
+class PosterCache:
+    """Disk-backed LRU cache of resized poster thumbnails.
+
+    Args:
+        cache_dir: Directory the thumbnails are written to
+        max_bytes: Total size the cache may grow to before evicting
+        thumb_width: Width in pixels of the stored thumbnails
+        workers: Number of background download threads
+        timeout: Timeout in seconds for a single poster download
+        retry_after: Seconds before a poster that failed to download is tried again
+    """
+
+    def __init__(self, cache_dir=None, max_bytes=None, thumb_width=None,
+                 workers=None, timeout=None, retry_after=None):
+        self.cache_dir = cache_dir or config.POSTER_CACHE_DIR
+        self.max_bytes = max_bytes or config.POSTER_CACHE_MAX_MB * 1024 * 1024
+        self.thumb_width = thumb_width or config.POSTER_THUMB_WIDTH
+        self.timeout = timeout or config.POSTER_FETCH_TIMEOUT
+        self.retry_after = config.POSTER_RETRY_SECONDS if retry_after is None else retry_after
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers or config.POSTER_FETCH_WORKERS,
+            thread_name_prefix="poster-fetch"
+        )
+        self._lock = threading.Lock()
+        self._pending = {}  # url -> Future of an in-flight download
+        self._failed = {}  # url -> time.monotonic() of its last failed download
+        self._entries = OrderedDict()  # filename -> size, oldest first
+        self._total_bytes = 0
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._load_index()
+
+    def _load_index(self):
+        """Rebuild the LRU order from the thumbnails already on disk."""
+        files = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.jpg'):
+                continue
+            stat = os.stat(os.path.join(self.cache_dir, name))
+            files.append((stat.st_mtime, name, stat.st_size))
+
+        for _, name, size in sorted(files):
+            self._entries[name] = size
+            self._total_bytes += size
+
+    def _filename(self, url):
+        return hashlib.sha1(url.encode('utf-8')).hexdigest() + '.jpg'
+
+    def path_for(self, url):
+        """Path the thumbnail for `url` is (or would be) stored at."""
+        return os.path.join(self.cache_dir, self._filename(url))
+
+    def get(self, url):
+        """Return the local thumbnail path for `url`, or None on a miss.
+
+        A hit marks the thumbnail as most recently used.
+        """
+        name = self._filename(url)
+        with self._lock:
+            if name not in self._entries:
+                return None
+            self._entries.move_to_end(name)
+
+        path = os.path.join(self.cache_dir, name)
+        try:
+            os.utime(path)  # Keep the LRU order across restarts
+        except OSError:
+            with self._lock:
+                self._forget(name)
+            return None
+        return path
+
+    def fetch(self, url):
+        """Download, resize and store a poster synchronously.
+
+        Returns:
+            Local thumbnail path, or None if the poster could not be fetched
+        """
+        path = self.get(url)
+        if path:
+            return path
+
+        name = self._filename(url)
+        path = os.path.join(self.cache_dir, name)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            response = requests.get(url, timeout=self.timeout)
+            response.raise_for_status()
+            data = self._make_thumbnail(response.content)
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)  # Readers never see a partial file
+        except (requests.RequestException, OSError, ValueError):
+            # Also a cache directory that is not writable (or a full disk)
+            with self._lock:
+                self._failed[url] = time.monotonic()
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return None
+
+        with self._lock:
+            self._forget(name)
+            self._entries[name] = len(data)
+            self._total_bytes += len(data)
+            self._evict()
+        return path
+
+    def _make_thumbnail(self, content):
+        with Image.open(io.BytesIO(content)) as img:
+            img = img.convert('RGB')
+            if img.width > self.thumb_width:
+                height = round(img.height * self.thumb_width / img.width)
+                img = img.resize((self.thumb_width, height), Image.LANCZOS)
+            out = io.BytesIO()
+            img.save(out, format='JPEG', quality=85, optimize=True)
+            return out.getvalue()
+
+    def _forget(self, name):
+        size = self._entries.pop(name, None)
+        if size is not None:
+            self._total_bytes -= size
+
+    def _evict(self):
+        """Drop least recently used thumbnails until under the size limit.
+
+        Must be called with the lock held.
+        """
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            name, size = self._entries.popitem(last=False)
+            self._total_bytes -= size
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+            except OSError:
+                pass
+
+    def prefetch(self, urls):
+        """Queue background downloads for posters that are not cached yet.
+
+        Args:
+            urls: Iterable of poster URLs
+
+        Returns:
+            List of futures for the downloads that were queued
+        """
+        futures = []
+        for url in urls:
+            if not url or self.get(url):
+                continue
+            with self._lock:
+                if self._failed_recently(url):
+                    continue
+                future = self._pending.get(url)
+                if future is None:
+                    future = self._executor.submit(self.fetch, url)
+                    self._pending[url] = future
+                    future.add_done_callback(
+                        lambda _f, u=url: self._pending.pop(u, None)
+                    )
+            futures.append(future)
+        return futures
+
+    def _failed_recently(self, url):
+        """Whether the last download of `url` failed less than retry_after ago.
+
+        Must be called with the lock held.
+        """
+        failed_at = self._failed.get(url)
+        if failed_at is None:
+            return False
+        if time.monotonic() - failed_at < self.retry_after:
+            return True
+        del self._failed[url]
+        return False
+
+    def get_or_fetch(self, url, timeout=None):
+        """Return a local thumbnail, waiting for (or starting) its download.
+
+        Args:
+            url: Poster URL
+            timeout: Seconds to wait for an in-flight download
+
+        Returns:
+            Local thumbnail path, or None if it is not available in time
+        """
+        path = self.get(url)
+        if path:
+            return path
+
+        futures = self.prefetch([url])
+        if not futures:
+            return self.get(url)
+        try:
+            return futures[0].result(timeout=timeout or self.timeout)
+        except Exception:
+            return None
+
+    @property
+    def total_bytes(self):
+        return self._total_bytes
+
+    def __len__(self):
+        return len(self._entries)
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+
+def to_data_uri(path):
+    """Encode a local thumbnail as a data URI for use in card HTML."""
+    with open(path, 'rb') as f:
+        encoded = base64.b64encode(f.read()).decode('ascii')
+    return f"data:image/jpeg;base64,{encoded}"
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_poster_cache():
+    """Return the process-wide poster cache, creating it on first use."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = PosterCache()
+        return _cache
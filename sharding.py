@@ -0,0 +1,545 @@
+"""
+Sharded deployment of the Movie Recommendation System.
+
+The catalog is split into shards by movie id (hash or id range). Each shard
+is served by its own process, which only loads its part of the catalog. A
+router sends the features of the query movie to every shard, collects each
+shard's local top K and merges them into the global top K. The results are
+identical to the single-node get_recommendations. Shards that are down or
+slower than the timeout are left out and the result is marked partial.
+The router and the shards authenticate each other with SHARD_AUTHKEY.
+
+Only recommendation queries are sharded. The Streamlit app does not use the
+router: it still loads the full catalog (titles, posters, filters) on every
+replica.
+
+Usage:
+    python sharding.py partition --shards 4 --scheme hash --out shards
+    LOAD_DATA_ON_IMPORT=false python sharding.py serve --manifest shards/manifest.json --shard 0 --port 6000
+    python sharding.py query --manifest shards/manifest.json --nodes host1:6000,host2:6000 --id 155
+    python sharding.py local --shards 4 --id 155
+"""
+
+import argparse
+import bisect
+import json
+import logging
+import math
+import os
+import secrets
+import socket
+import struct
+import subprocess
+import sys
+import threading
+import time
+from ast import literal_eval
+from concurrent.futures import ThreadPoolExecutor, wait
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import (Connection, Listener, answer_challenge,
+                                        deliver_challenge)
+from typing import List, NamedTuple, Tuple
+
+import pandas as pd
+
+import config
+import metadata_delta
+
+logger = logging.getLogger(__name__)
+
+FEATURE_COLUMNS = ['title', 'Genres bin', 'Actors bin', 'Director bin', 'popularity']
+# Start of the line `serve` prints once it accepts queries, read by start_local_shards
+SERVING = "🚀 Serving shard "
+
+
+class ShardedResult(NamedTuple):
+    """Recommendations from a sharded query."""
+    recommendations: List[Tuple[str, int]]  # (recommendation_text, movie_id), as get_recommendations
+    partial: bool  # True if some shards did not answer in time
+    missing_shards: List[int]
+
+
+# ============================================
+# Partitioning
+# ============================================
+
+def partition_catalog(out_dir, num_shards, scheme='hash', catalog_path=None, delta_path=None,
+                      chunksize=10000):
+    """Split the catalog into shard CSV files plus a manifest describing them.
+
+    The catalog is streamed in chunks, so it never has to fit in memory at once.
+    The metadata delta, if any, is folded into the shards.
+
+    Args:
+        out_dir: Directory for the shard files and manifest.json
+        num_shards: Number of shards
+        scheme: 'hash' (movie id modulo shard count) or 'range' (contiguous id ranges)
+        catalog_path: Catalog CSV (default from config)
+        delta_path: Metadata delta to fold in (default from config)
+        chunksize: Rows read at a time
+
+    Returns:
+        Path of the manifest
+    """
+    if scheme not in ('hash', 'range'):
+        raise ValueError(f"Unknown sharding scheme: {scheme}")
+    catalog_path = catalog_path or config.MOVIE_DATA_PATH
+    delta = metadata_delta.read_delta(delta_path or config.MOVIE_DELTA_PATH)
+    os.makedirs(out_dir, exist_ok=True)
+
+    # Pass 1: ids and the catalog-wide popularity range
+    ids = []
+    popularity = []
+    for chunk in pd.read_csv(catalog_path, usecols=['id', 'popularity'], index_col='id',
+                             chunksize=chunksize):
+        if delta is not None:
+            updated = delta.index.intersection(chunk.index)
+            chunk.loc[updated, 'popularity'] = delta.loc[updated, 'popularity'].astype(float)
+        ids.extend(chunk.index)
+        popularity.append(chunk['popularity'].astype(float))
+    popularity = pd.concat(popularity)
+
+    # The delta's credits are encoded with the vocabulary of the whole catalog
+    vocabularies = None
+    if delta is not None:
+        vocabularies = {col: metadata_delta.catalog_vocabulary(
+                            _read_credits(catalog_path, col, bin_col, chunksize))
+                        for col, bin_col in metadata_delta.BIN_COLUMNS.items()}
+
+    manifest = {
+        'scheme': scheme,
+        'num_shards': num_shards,
+        'boundaries': _range_boundaries(ids, num_shards) if scheme == 'range' else [],
+        'popularity_min': float(popularity.min()),
+        'popularity_max': float(popularity.max()),
+        'shards': [f"shard_{i}.csv" for i in range(num_shards)],
+    }
+
+    # Pass 2: route every row to its shard, remembering its catalog position
+    # so the router can break distance ties exactly like the single node does
+    paths = [os.path.join(out_dir, name) for name in manifest['shards']]
+    written = [False] * num_shards
+    position = 0
+    for chunk in pd.read_csv(catalog_path, index_col='id', chunksize=chunksize):
+        chunk['catalog position'] = range(position, position + len(chunk))
+        position += len(chunk)
+        if delta is not None:
+            metadata_delta.apply_delta(chunk, delta, vocabularies=vocabularies)
+
+        shard_ids = [shard_of(movie_id, manifest) for movie_id in chunk.index]
+        for shard, rows in chunk.groupby(shard_ids):
+            rows.to_csv(paths[shard], mode='a' if written[shard] else 'w', header=not written[shard])
+            written[shard] = True
+
+    for shard, path in enumerate(paths):
+        if not written[shard]:
+            pd.read_csv(catalog_path, index_col='id', nrows=0).assign(
+                **{'catalog position': []}).to_csv(path)
+
+    manifest_path = os.path.join(out_dir, 'manifest.json')
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest_path
+
+
+def _read_credits(catalog_path, col, bin_col, chunksize):
+    """Stream the parsed (names, binary vector) pairs of a credits column."""
+    for chunk in pd.read_csv(catalog_path, usecols=[col, bin_col], chunksize=chunksize):
+        for names, vector in zip(chunk[col], chunk[bin_col]):
+            yield literal_eval(names), literal_eval(vector)
+
+
+def _range_boundaries(ids, num_shards):
+    """First movie id of every shard but the first, splitting ids into equal counts."""
+    ids = sorted(int(i) for i in ids)
+    return [ids[len(ids) * i // num_shards] for i in range(1, num_shards)]
+
+
+def shard_of(movie_id, manifest):
+    """Index of the shard that holds a movie."""
+    if manifest['scheme'] == 'range':
+        return bisect.bisect_right(manifest['boundaries'], int(movie_id))
+    return int(movie_id) % manifest['num_shards']
+
+
+def load_manifest(path):
+    with open(path) as f:
+        manifest = json.load(f)
+    manifest['dir'] = os.path.dirname(os.path.abspath(path))
+    return manifest
+
+
+# ============================================
+# Shard server
+# ============================================
+
+def serve_shard(manifest_path, shard, address, authkey=None, ready=None):
+    """Serve one shard until the process is stopped.
+
+    Replaces the data of my_functions in this process with the shard, so it
+    runs in a process of its own, e.g. `python sharding.py serve`. Set
+    LOAD_DATA_ON_IMPORT=false there, or the full catalog is loaded first.
+
+    Args:
+        manifest_path: Manifest written by partition_catalog
+        shard: Index of the shard to serve
+        address: (host, port) to listen on; port 0 picks a free port
+        authkey: Shared secret (default SHARD_AUTHKEY from config, required)
+        ready: Optional callable the bound address is passed to once serving
+    """
+    authkey = _require_authkey(authkey)
+    manifest = load_manifest(manifest_path)
+
+    import my_functions as myfn
+    if myfn.df is not None:
+        logger.warning("The full catalog was loaded before shard %d, "
+                       "set LOAD_DATA_ON_IMPORT=false on shard nodes", shard)
+
+    # Load this shard only, normalized with the catalog-wide popularity range.
+    # The metadata delta is already folded in by partition_catalog.
+    myfn.reload_data(os.path.join(manifest['dir'], manifest['shards'][shard]), delta_path='',
+                     popularity_range=(manifest['popularity_min'], manifest['popularity_max']))
+
+    listener = Listener(address, authkey=authkey)
+    if ready is not None:
+        ready(listener.address)
+
+    while True:
+        try:
+            conn = listener.accept()
+        except (OSError, EOFError, AuthenticationError):
+            continue  # Failed handshake, e.g. a client with the wrong authkey
+        threading.Thread(target=_handle_connection, args=(myfn, conn), daemon=True).start()
+
+
+def _handle_connection(myfn, conn):
+    with conn:
+        while True:
+            try:
+                request = conn.recv()
+            except (EOFError, OSError):
+                return
+            try:
+                response = ('ok', _dispatch(myfn, request))
+            except Exception as e:
+                response = ('error', f"{type(e).__name__}: {e}")
+            conn.send(response)
+
+
+def _dispatch(myfn, request):
+    command = request[0]
+    if command == 'ping':
+        return 'pong'
+    if command == 'movie':
+        return _movie_features(myfn, request[1])
+    if command == 'top_k':
+        return _local_top_k(myfn, *request[1:])
+    raise ValueError(f"Unknown command: {command}")
+
+
+def _movie_features(myfn, movie_id):
+    """Features compute_dist needs for a movie, or None if it is not in this shard."""
+    if movie_id not in myfn.df.index:
+        return None
+    row = myfn.df.loc[movie_id]
+    return {col: row[col] for col in FEATURE_COLUMNS}
+
+
+def _local_top_k(myfn, movie_id, movie, k, genres, min_popularity, exclude_ids):
+    """This shard's k closest movies: (distance, catalog position, movie_id, text) tuples."""
+    query_df = pd.DataFrame([movie], index=[movie_id])
+    candidates = myfn._candidate_ids(movie_id, genres, min_popularity, exclude_ids,
+                                     require_movie=False)
+    distances = myfn._score_candidates(movie_id, candidates, query_df)
+    return [
+        (dist, int(myfn.df['catalog position'][idd]), idd, myfn._format_recommendation(title, idd))
+        for title, dist, idd in myfn._select_top(distances, k)
+    ]
+
+
+def start_local_shards(manifest_path, host='127.0.0.1', authkey=None, timeout=120):
+    """Start one local `sharding.py serve` process per shard, standing in for separate nodes.
+
+    Returns:
+        Tuple of (processes, addresses), in shard order
+    """
+    manifest = load_manifest(manifest_path)
+    # Passed in the environment, command lines are visible to other users
+    env = dict(os.environ, SHARD_AUTHKEY=_require_authkey(authkey).decode(),
+               LOAD_DATA_ON_IMPORT='false')
+
+    processes = []
+    for shard in range(manifest['num_shards']):
+        processes.append(subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), 'serve', '--manifest',
+             os.path.abspath(manifest_path), '--shard', str(shard), '--host', host, '--port', '0'],
+            stdout=subprocess.PIPE, text=True, env=env))
+
+    # Every shard prints its address once it is serving
+    with ThreadPoolExecutor(max_workers=len(processes)) as pool:
+        futures = [pool.submit(_read_address, process) for process in processes]
+        wait(futures, timeout=timeout)
+        for shard, future in enumerate(futures):
+            if not future.done() or future.result() is None:
+                stop_local_shards(processes)  # Also ends the pending reads
+                raise RuntimeError(f"Shard {shard} did not start within {timeout}s")
+        addresses = [future.result() for future in futures]
+    return processes, addresses
+
+
+def _read_address(process):
+    for line in process.stdout:
+        if line.startswith(SERVING):
+            return _parse_address(line.rsplit(' ', 1)[1].strip())
+    return None  # Exited without serving
+
+
+def stop_local_shards(processes):
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        process.wait()
+        process.stdout.close()
+
+
+# ============================================
+# Router
+# ============================================
+
+class ShardRouter:
+    """Scatter-gather queries over the shard servers.
+
+    Args:
+        manifest: Manifest dict or path written by partition_catalog
+        addresses: (host, port) of every shard, in shard order
+        authkey: Shared secret (default SHARD_AUTHKEY from config, required)
+        timeout: Seconds to wait for the shards (default from config)
+        workers: Threads talking to the shards (default from config)
+    """
+
+    def __init__(self, manifest, addresses, authkey=None, timeout=None, workers=None):
+        self.manifest = load_manifest(manifest) if isinstance(manifest, str) else manifest
+        if len(addresses) != self.manifest['num_shards']:
+            raise ValueError(f"Expected {self.manifest['num_shards']} shard addresses, got {len(addresses)}")
+        self.addresses = [tuple(a) for a in addresses]
+        self.authkey = _require_authkey(authkey)
+        self.timeout = timeout or config.SHARD_TIMEOUT
+        self._idle = [[] for _ in self.addresses]  # Reusable connections per shard
+        self._lock = threading.Lock()
+        # Every step of a request is bounded by the timeout, so a hanging node
+        # holds a worker for a few timeouts at most instead of leaking a thread
+        self._pool = ThreadPoolExecutor(max_workers=workers or config.SHARD_ROUTER_WORKERS,
+                                        thread_name_prefix="shard-router")
+
+    def get_recommendations(self, ID, K=None, genres=None, min_popularity=None, exclude_ids=None):
+        """Get movie recommendations from all shards.
+
+        Arguments are the same as my_functions.get_recommendations (without
+        diversity re-ranking, which needs the features of the whole pool).
+
+        Returns:
+            ShardedResult
+        """
+        if K is None:
+            K = config.NUM_RECOMMENDATIONS
+        genres = tuple(sorted(set(genres))) if genres else ()
+        exclude_ids = tuple(sorted(set(exclude_ids))) if exclude_ids else ()
+        if min_popularity is not None and min_popularity <= 0:
+            min_popularity = None
+
+        deadline = time.monotonic() + self.timeout
+
+        # The shard holding the movie provides its feature vector
+        owner = shard_of(ID, self.manifest)
+        future = self._request(owner, ('movie', ID))
+        try:
+            movie = future.result(timeout=max(deadline - time.monotonic(), 0))
+        except Exception:
+            future.cancel()
+            return ShardedResult([], True, [owner])
+        if movie is None:
+            raise KeyError(ID)
+
+        # Scatter the vector, gather every shard's local top K
+        futures = [self._request(shard, ('top_k', ID, movie, K, genres, min_popularity, exclude_ids))
+                   for shard in range(len(self.addresses))]
+        wait(futures, timeout=max(deadline - time.monotonic(), 0))
+
+        candidates = []
+        missing = []
+        for shard, future in enumerate(futures):
+            if future.done() and future.exception() is None:
+                candidates.extend(future.result())
+            else:
+                future.cancel()  # Not sent yet if the workers are busy
+                missing.append(shard)
+
+        # Same order as the single node: by distance, undefined distances last,
+        # ties in catalog order
+        candidates.sort(key=lambda c: (_sortable_distance(c[0]), c[1]))
+        recommendations = [(text, idd) for _, _, idd, text in candidates[:K]]
+        return ShardedResult(recommendations, bool(missing), missing)
+
+    def ping(self):
+        """Indices of the shards that answer within the timeout."""
+        futures = [self._request(shard, ('ping',)) for shard in range(len(self.addresses))]
+        wait(futures, timeout=self.timeout)
+        return [shard for shard, f in enumerate(futures) if f.done() and f.exception() is None]
+
+    def _request(self, shard, request):
+        """Send a request to a shard on a worker thread, returning a Future."""
+        return self._pool.submit(self._call, shard, request)
+
+    def _call(self, shard, request):
+        conn = self._acquire(shard)
+        try:
+            conn.send(request)
+            if not conn.poll(self.timeout):
+                raise TimeoutError(f"Shard {shard} did not answer within {self.timeout}s")
+            status, payload = conn.recv()
+        except Exception:
+            conn.close()  # A late answer would confuse the next request
+            raise
+        self._release(shard, conn)
+        if status != 'ok':
+            raise RuntimeError(f"Shard {shard}: {payload}")
+        return payload
+
+    def _acquire(self, shard):
+        with self._lock:
+            if self._idle[shard]:
+                return self._idle[shard].pop()
+        return self._connect(shard)
+
+    def _connect(self, shard):
+        """Client() with the timeout applied to connecting and to every socket operation."""
+        sock = socket.create_connection(self.addresses[shard], timeout=self.timeout)
+        try:
+            # Connection expects a blocking socket, so time out at the OS level instead
+            sock.settimeout(None)
+            if sys.platform == 'win32':
+                timeval = struct.pack('I', int(self.timeout * 1000))
+            else:
+                timeval = struct.pack('ll', int(self.timeout), int(self.timeout % 1 * 1e6))
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVTIMEO, timeval)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDTIMEO, timeval)
+            conn = Connection(sock.detach())
+        except Exception:
+            sock.close()
+            raise
+        try:
+            answer_challenge(conn, self.authkey)
+            deliver_challenge(conn, self.authkey)
+        except Exception:
+            conn.close()
+            raise
+        return conn
+
+    def _release(self, shard, conn):
+        with self._lock:
+            self._idle[shard].append(conn)
+
+    def close(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        with self._lock:
+            for conns in self._idle:
+                for conn in conns:
+                    conn.close()
+                conns.clear()
+
+
+# ============================================
+# Command line
+# ============================================
+
+def _sortable_distance(dist):
+    # As my_functions._sortable_distance, which the router cannot import
+    # without loading the catalog
+    return math.inf if math.isnan(dist) else dist
+
+
+def _require_authkey(authkey):
+    """The shared secret as bytes; there is deliberately no default."""
+    authkey = authkey or config.SHARD_AUTHKEY
+    if not authkey:
+        raise ValueError("No shard authkey: set SHARD_AUTHKEY to a shared secret")
+    return authkey.encode()
+
+
+def _parse_address(text):
+    host, port = text.rsplit(':', 1)
+    return host, int(port)
+
+
+def _print_result(result):
+    for text, _ in result.recommendations:
+        print(f"   {text}")
+    if result.partial:
+        print(f"⚠️ Partial result, no answer from shard(s): {result.missing_shards}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the recommendation system as shards")
+    commands = parser.add_subparsers(dest="command")
+
+    partition = commands.add_parser("partition", help="Split the catalog into shard files")
+    partition.add_argument("--shards", "-n", type=int, required=True, help="Number of shards")
+    partition.add_argument("--scheme", choices=["hash", "range"], default="hash",
+                           help="Partition by id hash or by id range")
+    partition.add_argument("--out", "-o", default="shards", help="Output directory")
+
+    serve = commands.add_parser("serve", help="Serve one shard")
+    serve.add_argument("--manifest", "-m", required=True, help="Manifest written by partition")
+    serve.add_argument("--shard", "-s", type=int, required=True, help="Shard index")
+    serve.add_argument("--host", default="127.0.0.1",
+                       help="Address to listen on (0.0.0.0 for all interfaces, only on a trusted network)")
+    serve.add_argument("--port", "-p", type=int, required=True, help="Port to listen on")
+
+    query = commands.add_parser("query", help="Query running shards")
+    query.add_argument("--manifest", "-m", required=True, help="Manifest written by partition")
+    query.add_argument("--nodes", required=True, help="Comma separated host:port, in shard order")
+    query.add_argument("--id", "-i", type=int, required=True, help="Movie ID")
+    query.add_argument("-k", type=int, default=config.NUM_RECOMMENDATIONS, help="Number of recommendations")
+
+    local = commands.add_parser("local", help="Partition, start local shard processes and query them")
+    local.add_argument("--shards", "-n", type=int, default=4, help="Number of shards")
+    local.add_argument("--scheme", choices=["hash", "range"], default="hash",
+                       help="Partition by id hash or by id range")
+    local.add_argument("--out", "-o", default="shards", help="Output directory")
+    local.add_argument("--id", "-i", type=int, required=True, help="Movie ID")
+    local.add_argument("-k", type=int, default=config.NUM_RECOMMENDATIONS, help="Number of recommendations")
+
+    args = parser.parse_args()
+
+    if args.command in ("serve", "query") and not config.SHARD_AUTHKEY:
+        print("❌ Set SHARD_AUTHKEY to a secret shared by the router and all shards")
+        sys.exit(1)
+
+    if args.command == "partition":
+        manifest_path = partition_catalog(args.out, args.shards, args.scheme)
+        print(f"✅ Wrote {args.shards} shards, manifest: {manifest_path}")
+    elif args.command == "serve":
+        serve_shard(args.manifest, args.shard, (args.host, args.port),
+                    ready=lambda address: print(f"{SERVING}{args.shard} on {address[0]}:{address[1]}",
+                                                flush=True))
+    elif args.command == "query":
+        router = ShardRouter(args.manifest, [_parse_address(a) for a in args.nodes.split(',')])
+        _print_result(router.get_recommendations(args.id, K=args.k))
+    elif args.command == "local":
+        manifest_path = partition_catalog(args.out, args.shards, args.scheme)
+        print(f"🚀 Starting {args.shards} local shards...")
+        # Local shards only need a key for this run
+        authkey = config.SHARD_AUTHKEY or secrets.token_hex(16)
+        processes, addresses = start_local_shards(manifest_path, authkey=authkey)
+        try:
+            router = ShardRouter(manifest_path, addresses, authkey=authkey)
+            _print_result(router.get_recommendations(args.id, K=args.k))
+        finally:
+            stop_local_shards(processes)
+    else:
+        parser.print_help()
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,21 @@
+"""
+Shared fixtures for the test suite.
+"""
+import os
+import sys
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(autouse=True)
+def isolated_access_log(tmp_path, monkeypatch):
+    """Count test requests in a temporary access log, not the one that drives warm-up."""
+    import config
+    from access_log import AccessLog
+    path = str(tmp_path / 'access_log.json')
+    monkeypatch.setattr(config, 'ACCESS_LOG_PATH', path)
+    if 'my_functions' in sys.modules:
+        monkeypatch.setattr(sys.modules['my_functions'], 'access_log', AccessLog(path=path))
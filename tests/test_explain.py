@@ -0,0 +1,49 @@
+"""
+Unit tests for the query explain tool.
+"""
+import os
+import sys
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class TestExplain:
+    """Test the stage-by-stage query breakdown."""
+
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        """Setup for tests - skip if data file not found."""
+        import config
+        if not os.path.exists(config.MOVIE_DATA_PATH):
+            pytest.skip("Movie data file not found")
+
+    def test_results_match_get_recommendations(self):
+        """Test that the explained query returns the real recommendations."""
+        import explain
+        myfn, _ = explain.load()
+        movie_id = myfn.get_all_movies()[0][0]
+        report = explain.explain_query(myfn, movie_id, 5)
+        expected = [rec_id for _, rec_id in myfn.get_recommendations(movie_id, K=5)]
+        assert [row['id'] for row in report['results']] == expected
+
+    def test_all_stages_timed(self):
+        """Test that every query stage is reported."""
+        import explain
+        myfn, _ = explain.load()
+        report = explain.explain_query(myfn, myfn.get_all_movies()[0][0], 3)
+        assert [stage for stage, _ in report['timings']] == \
+            ['candidates', 'scoring', 'selection', 'formatting']
+        assert all(seconds >= 0 for _, seconds in report['timings'])
+
+    def test_components_add_up_to_distance(self):
+        """Test that the per-feature distances sum to the ranking distance."""
+        import explain
+        myfn, _ = explain.load()
+        report = explain.explain_query(myfn, myfn.get_all_movies()[0][0], 5)
+        for row in report['results']:
+            total = sum(row[feature] for feature in explain.FEATURES)
+            if total == total:  # Skip NaN distances of movies without vectors
+                assert total == pytest.approx(row['distance'])
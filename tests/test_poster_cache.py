@@ -0,0 +1,205 @@
+"""
+Unit tests for the poster thumbnail cache.
+Posters are served by a local stub image server, so no network is needed.
+"""
+import io
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from PIL import Image
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from poster_cache import PosterCache, to_data_uri
+
+
+def make_jpeg(width, height):
+    out = io.BytesIO()
+    Image.new('RGB', (width, height), (200, 30, 30)).save(out, format='JPEG')
+    return out.getvalue()
+
+
+class StubPosterHandler(BaseHTTPRequestHandler):
+    """Serves a 1000x1500 JPEG for /poster/*, 404 for anything else."""
+
+    image = make_jpeg(1000, 1500)
+    hits = []
+
+    def do_GET(self):
+        self.hits.append(self.path)
+        if not self.path.startswith('/poster/'):
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'image/jpeg')
+        self.send_header('Content-Length', str(len(self.image)))
+        self.end_headers()
+        self.wfile.write(self.image)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope='module')
+def stub_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubPosterHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = PosterCache(cache_dir=str(tmp_path), max_bytes=10 * 1024 * 1024,
+                        thumb_width=100, workers=2, timeout=5)
+    yield cache
+    cache.shutdown()
+
+
+class TestPosterCache:
+    """Test thumbnail fetching, storage and eviction."""
+
+    def test_fetch_stores_resized_thumbnail(self, cache, stub_server):
+        """Test that posters are downscaled to the thumbnail width."""
+        path = cache.fetch(f"{stub_server}/poster/a.jpg")
+        assert path is not None and os.path.exists(path)
+        with Image.open(path) as img:
+            assert img.size == (100, 150)
+
+    def test_cache_hit_skips_download(self, cache, stub_server):
+        """Test that a cached poster is not downloaded again."""
+        url = f"{stub_server}/poster/hit.jpg"
+        cache.fetch(url)
+        before = len(StubPosterHandler.hits)
+        assert cache.get_or_fetch(url) == cache.path_for(url)
+        assert len(StubPosterHandler.hits) == before
+
+    def test_missing_poster_returns_none(self, cache, stub_server):
+        """Test that a failed download is reported as a miss."""
+        assert cache.get_or_fetch(f"{stub_server}/missing.jpg") is None
+
+    def test_failed_download_is_not_retried_at_once(self, tmp_path, stub_server):
+        """Test that a poster that failed is only requested again after retry_after."""
+        url = f"{stub_server}/missing-retry.jpg"
+        cache = PosterCache(cache_dir=str(tmp_path), thumb_width=100, retry_after=3600)
+        assert cache.get_or_fetch(url) is None
+        before = len(StubPosterHandler.hits)
+        assert cache.prefetch([url]) == []
+        assert cache.get_or_fetch(url) is None
+        assert len(StubPosterHandler.hits) == before
+        cache.shutdown()
+
+        retrying = PosterCache(cache_dir=str(tmp_path), thumb_width=100, retry_after=0)
+        retrying.get_or_fetch(url)
+        retrying.get_or_fetch(url)
+        assert len(StubPosterHandler.hits) == before + 2
+        retrying.shutdown()
+
+    def test_write_error_is_a_miss(self, cache, stub_server):
+        """Test that a thumbnail that cannot be stored is reported as a miss."""
+        os.rmdir(cache.cache_dir)  # Gone after the cache was created
+        assert cache.fetch(f"{stub_server}/poster/unwritable.jpg") is None
+
+    def test_prefetch_in_background(self, cache, stub_server):
+        """Test that prefetch downloads all posters through the pool."""
+        urls = [f"{stub_server}/poster/p{i}.jpg" for i in range(6)]
+        futures = cache.prefetch(urls)
+        assert len(futures) == 6
+        for future in futures:
+            future.result(timeout=10)
+        assert all(cache.get(url) for url in urls)
+
+    def test_lru_eviction(self, tmp_path, stub_server):
+        """Test that the least recently used thumbnail is evicted first."""
+        probe = PosterCache(cache_dir=str(tmp_path / 'probe'), thumb_width=100)
+        size = os.path.getsize(probe.fetch(f"{stub_server}/poster/probe.jpg"))
+        probe.shutdown()
+
+        cache = PosterCache(cache_dir=str(tmp_path / 'lru'), max_bytes=size * 2,
+                            thumb_width=100)
+        first, second, third = (f"{stub_server}/poster/{n}.jpg" for n in 'xyz')
+        cache.fetch(first)
+        cache.fetch(second)
+        cache.get(first)  # `second` is now the least recently used
+        cache.fetch(third)
+        cache.shutdown()
+
+        assert cache.get(first) is not None
+        assert cache.get(second) is None
+        assert cache.get(third) is not None
+        assert cache.total_bytes <= size * 2
+
+    def test_index_survives_restart(self, tmp_path, stub_server):
+        """Test that thumbnails on disk are reused by a new cache."""
+        url = f"{stub_server}/poster/persist.jpg"
+        cache = PosterCache(cache_dir=str(tmp_path), thumb_width=100)
+        cache.fetch(url)
+        cache.shutdown()
+
+        reopened = PosterCache(cache_dir=str(tmp_path), thumb_width=100)
+        assert reopened.get(url) == cache.path_for(url)
+        assert len(reopened) == 1
+        reopened.shutdown()
+
+    def test_to_data_uri(self, cache, stub_server):
+        """Test that thumbnails can be inlined into card HTML."""
+        path = cache.fetch(f"{stub_server}/poster/uri.jpg")
+        assert to_data_uri(path).startswith('data:image/jpeg;base64,')
+
+
+class TestMovieThumbnails:
+    """Test the thumbnail helpers in my_functions."""
+
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        """Setup for tests - skip if data file not found."""
+        import config
+        if not os.path.exists(config.MOVIE_DATA_PATH):
+            pytest.skip("Movie data file not found")
+
+    def test_thumbnail_falls_back_to_default(self):
+        """Test that movies without a poster get the placeholder."""
+        import my_functions as myfn
+        import config
+        assert myfn.get_movie_thumbnail(-99999) == config.DEFAULT_POSTER_URL
+
+    def test_thumbnail_miss_does_not_wait(self, tmp_path, monkeypatch):
+        """Test that a poster that is not cached yet returns the placeholder at once."""
+        import socket
+        import time
+        import config
+        import my_functions as myfn
+        import poster_cache
+
+        with socket.socket() as silent:  # Accepts connections, never replies
+            silent.bind(('127.0.0.1', 0))
+            silent.listen()
+            host, port = silent.getsockname()
+            cache = PosterCache(cache_dir=str(tmp_path), timeout=2)
+            monkeypatch.setattr(poster_cache, '_cache', cache)
+            monkeypatch.setattr(myfn, 'get_movie_poster', lambda i: f"http://{host}:{port}/{i}.jpg")
+
+            start = time.monotonic()
+            thumbnails = [myfn.get_movie_thumbnail(i) for i in range(8)]
+            assert time.monotonic() - start < 1
+            assert thumbnails == [config.DEFAULT_POSTER_URL] * 8
+            cache.shutdown(wait=False)
+
+    def test_unwritable_cache_dir_falls_back_to_default(self, tmp_path, monkeypatch):
+        """Test that a cache directory that cannot be created gives the placeholder."""
+        import config
+        import my_functions as myfn
+        import poster_cache
+
+        blocker = tmp_path / 'not-a-directory'
+        blocker.write_text('')
+        monkeypatch.setattr(config, 'POSTER_CACHE_DIR', str(blocker / 'posters'))
+        monkeypatch.setattr(poster_cache, '_cache', None)
+        monkeypatch.setattr(myfn, 'get_movie_poster', lambda i: "http://127.0.0.1:9/poster.jpg")
+        assert myfn.get_movie_thumbnail(1) == config.DEFAULT_POSTER_URL
+        myfn.prefetch_posters([1])
@@ -113,6 +113,27 @@ class TestMyFunctions:
                 assert isinstance(rec, tuple)
                 assert len(rec) == 2
                 assert isinstance(rec[0], str)  # Description text
+    
+    def test_data_version_tracks_file(self, tmp_path, monkeypatch):
+        """Test that the data version only changes when the data file does."""
+        import my_functions as myfn
+        import config
+        version = myfn.get_data_version()
+        assert isinstance(version, str) and version
+        assert myfn._data_version() == version
+        
+        monkeypatch.setattr(config, 'MOVIE_DELTA_PATH', str(tmp_path / 'delta.csv'))
+        assert myfn._data_version() == myfn._file_version(config.MOVIE_DATA_PATH)
+    
+    def test_data_version_tracks_delta(self, tmp_path, monkeypatch):
+        """Test that the data version changes with the metadata delta."""
+        import my_functions as myfn
+        import config
+        delta_path = tmp_path / 'delta.csv'
+        delta_path.write_text('id\n')
+        monkeypatch.setattr(config, 'MOVIE_DELTA_PATH', str(delta_path))
+        assert myfn._data_version() == (myfn._file_version(config.MOVIE_DATA_PATH) + '+'
+                                        + myfn._file_version(str(delta_path)))
 
 
 class TestCaching:
@@ -140,5 +161,117 @@ class TestCaching:
             assert recs1 == recs2
 
 
+class TestFilters:
+    """Test filtered recommendations."""
+    
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        """Setup for tests."""
+        import config
+        if not os.path.exists(config.MOVIE_DATA_PATH):
+            pytest.skip("Movie data file not found")
+    
+    def test_genre_filter(self):
+        """Test that every recommendation has one of the requested genres."""
+        import my_functions as myfn
+        movie_id = myfn.get_all_movies()[0][0]
+        genre = myfn.get_all_genres()[0]
+        recs = myfn.get_recommendations(movie_id, K=3, genres=[genre])
+        assert recs
+        for _, rec_id in recs:
+            assert genre in myfn.df['Genre list'][rec_id]
+    
+    def test_popularity_filter(self):
+        """Test that recommendations respect the popularity threshold."""
+        import my_functions as myfn
+        movie_id = myfn.get_all_movies()[0][0]
+        recs = myfn.get_recommendations(movie_id, K=5, min_popularity=0.37)
+        for _, rec_id in recs:
+            assert myfn.df['popularity'][rec_id] >= 0.37
+    
+    def test_popularity_mask_matches_comparison(self):
+        """Test that the bucketed popularity mask equals a plain comparison."""
+        import numpy as np
+        import my_functions as myfn
+        popularity = myfn.df['popularity'].values
+        for threshold in [0.01, 0.1, 0.37, 0.5, 0.999, 1.0, 1.5]:
+            assert np.array_equal(myfn._popularity_mask(threshold), popularity >= threshold)
+    
+    def test_exclude_ids_still_returns_k(self):
+        """Test that excluded movies are replaced rather than dropped."""
+        import my_functions as myfn
+        movie_id = myfn.get_all_movies()[0][0]
+        unfiltered = myfn.get_recommendations(movie_id, K=3)
+        watched = [rec_id for _, rec_id in unfiltered]
+        recs = myfn.get_recommendations(movie_id, K=3, exclude_ids=watched)
+        assert len(recs) == 3
+        assert not set(watched) & {rec_id for _, rec_id in recs}
+    
+    def test_filters_are_part_of_cache_key(self):
+        """Test that filtered and unfiltered results are cached separately."""
+        import my_functions as myfn
+        movie_id = myfn.get_all_movies()[0][0]
+        unfiltered = myfn.get_recommendations(movie_id, K=3)
+        filtered = myfn.get_recommendations(movie_id, K=3, exclude_ids=[unfiltered[0][1]])
+        assert unfiltered != filtered
+        assert myfn.get_recommendations(movie_id, K=3) == unfiltered
+
+
+class TestDiversity:
+    """Test maximal marginal relevance re-ranking."""
+    
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        """Setup for tests."""
+        import config
+        if not os.path.exists(config.MOVIE_DATA_PATH):
+            pytest.skip("Movie data file not found")
+    
+    def test_pairwise_similarity_matches_compute_dist(self):
+        """Test that the similarity matrix agrees with compute_dist."""
+        import my_functions as myfn
+        ids = [movie_id for movie_id, _ in myfn.get_all_movies()[:4]]
+        similarity = myfn.pairwise_similarity(ids)
+        for i, a in enumerate(ids):
+            for j, b in enumerate(ids):
+                dist = myfn.compute_dist(myfn.df, a, myfn.df, b)
+                if dist == dist:  # Skip NaN distances of movies without vectors
+                    assert similarity[i, j] == pytest.approx(1 - dist / 4)
+    
+    def test_mmr_returns_k_distinct(self):
+        """Test that re-ranking still returns K different movies."""
+        import my_functions as myfn
+        movie_id = myfn.get_all_movies()[0][0]
+        recs = myfn.get_recommendations(movie_id, K=5, mmr_lambda=0.3)
+        assert len(recs) == 5
+        assert len({rec_id for _, rec_id in recs}) == 5
+    
+    def test_mmr_keeps_best_match_first(self):
+        """Test that the most similar movie is always picked first."""
+        import my_functions as myfn
+        movie_id = myfn.get_all_movies()[0][0]
+        base = myfn.get_recommendations(movie_id, K=5)
+        diverse = myfn.get_recommendations(movie_id, K=5, mmr_lambda=0.5)
+        assert diverse[0] == base[0]
+    
+    def test_lambda_one_is_plain_ranking(self):
+        """Test that mmr_lambda=1 gives the unmodified recommendations."""
+        import my_functions as myfn
+        movie_id = myfn.get_all_movies()[0][0]
+        assert myfn.get_recommendations(movie_id, K=5, mmr_lambda=1) == \
+            myfn.get_recommendations(movie_id, K=5)
+    
+    def test_mmr_increases_diversity(self):
+        """Test that re-ranked results are less similar to each other."""
+        import numpy as np
+        import my_functions as myfn
+        movie_id = myfn.get_all_movies()[0][0]
+        pairs = np.triu_indices(5, 1)
+        base = [rec_id for _, rec_id in myfn.get_recommendations(movie_id, K=5)]
+        diverse = [rec_id for _, rec_id in myfn.get_recommendations(movie_id, K=5, mmr_lambda=0.2)]
+        assert myfn.pairwise_similarity(diverse)[pairs].mean() <= \
+            myfn.pairwise_similarity(base)[pairs].mean()
+
+
 if __name__ == '__main__':
     pytest.main([__file__, '-v'])
@@ -0,0 +1,253 @@
+"""
+Unit tests for the incremental metadata refresh.
+TMDB is replaced by a local stub server, so no API key or network is needed.
+"""
+import json
+import os
+import sys
+import threading
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import add_movies
+import metadata_delta
+
+
+CHANGED = {
+    1: {'popularity': 90.0, 'poster_path': 'new1.jpg',
+        'cast': ['Actor A', 'Actor C', 'Actor X'], 'directors': ['Director B']},
+    2: {'popularity': 5.0, 'poster_path': 'new2.jpg',
+        'cast': ['Actor B'], 'directors': ['Director A']},
+}
+NOT_IN_CATALOG = 999
+ACTOR_ORDER = ['Actor C', 'Actor A', 'Actor B']
+DIRECTOR_ORDER = ['Director B', 'Director A']
+
+
+class StubTMDBHandler(BaseHTTPRequestHandler):
+    """Serves /movie/changes (two pages) and /movie/<id> for the CHANGED movies."""
+
+    requests_seen = []
+    # Movies whose details request is answered by closing the connection
+    dropped = set()
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        self.requests_seen.append((url.path, query))
+
+        if url.path == '/movie/changes':
+            page = int(query['page'][0])
+            results = [{'id': 1}, {'id': NOT_IN_CATALOG}] if page == 1 else [{'id': 2}]
+            self._send_json({'results': results, 'page': page, 'total_pages': 2})
+        elif url.path.startswith('/movie/') and int(url.path.split('/')[-1]) in self.dropped:
+            self.close_connection = True
+        elif url.path.startswith('/movie/') and int(url.path.split('/')[-1]) in CHANGED:
+            tmdb_id = int(url.path.split('/')[-1])
+            movie = CHANGED[tmdb_id]
+            self._send_json({
+                'id': tmdb_id,
+                'title': f'Movie {tmdb_id}',
+                'popularity': movie['popularity'],
+                'poster_path': movie['poster_path'],
+                'genres': [{'name': 'Drama'}],
+                'credits': {
+                    'cast': [{'name': n} for n in movie['cast']],
+                    'crew': [{'name': n, 'job': 'Director'} for n in movie['directors']],
+                },
+            })
+        else:
+            self.send_error(404)
+
+    def _send_json(self, data):
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope='module')
+def stub_tmdb():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubTMDBHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+@pytest.fixture
+def catalog(tmp_path, stub_tmdb, monkeypatch):
+    """A three movie catalog and a refresh pointed at the stub server."""
+    monkeypatch.setattr(add_movies, 'TMDB_BASE_URL', stub_tmdb)
+    monkeypatch.setattr(add_movies, 'TMDB_API_KEY', 'test-key')
+    StubTMDBHandler.requests_seen.clear()
+
+    rows = []
+    for tmdb_id, actors, directors in [(1, ['Actor A', 'Actor B'], ['Director A']),
+                                       (2, ['Actor C'], ['Director B']),
+                                       (3, ['Actor A'], ['Director A'])]:
+        rows.append({
+            'id': tmdb_id, 'title': f'Movie {tmdb_id}', 'popularity': 10.0 * tmdb_id,
+            'imdb_id': f'tt{tmdb_id}', 'Genre list': ['Drama'], 'Top actor list': actors,
+            'Director list': directors, 'Genres bin': [1],
+            # Not in sorted order, like catalogs from the data preparation notebook
+            'Actors bin': add_movies.create_binary_vector(actors, ACTOR_ORDER),
+            'Director bin': add_movies.create_binary_vector(directors, DIRECTOR_ORDER),
+            'posters': f'old{tmdb_id}.jpg',
+        })
+    path = tmp_path / 'movie_data.csv'
+    pd.DataFrame(rows).set_index('id').to_csv(path)
+    return {
+        'catalog_path': str(path),
+        'delta_path': str(tmp_path / 'delta.csv'),
+        'state_path': str(tmp_path / 'state.json'),
+    }
+
+
+class TestVocabulary:
+    """Test recovering the name order of a catalog's binary vectors."""
+
+    def test_recovers_unsorted_order(self):
+        """Test that every name gets the position the catalog encoded it at."""
+        order = ['b', 'd', 'a', 'c']
+        movies = [['a', 'b'], ['b', 'c'], ['d'], ['a']]
+        vocabulary = metadata_delta.catalog_vocabulary(
+            (names, add_movies.create_binary_vector(names, order)) for names in movies)
+        assert vocabulary.positions == {name: i for i, name in enumerate(order)}
+        assert vocabulary.encode(['c', 'unknown']) == [0, 0, 0, 1]
+
+    def test_names_always_together_reproduce_the_catalog(self):
+        """Test that interchangeable names still encode the existing movies exactly."""
+        order = ['y', 'x', 'z']
+        movies = [['x', 'y'], ['z']]
+        vectors = [add_movies.create_binary_vector(names, order) for names in movies]
+        vocabulary = metadata_delta.catalog_vocabulary(zip(movies, vectors))
+        assert [vocabulary.encode(names) for names in movies] == vectors
+
+
+class TestRefresh:
+    """Test the TMDB changes driven refresh."""
+
+    def test_refresh_writes_delta_for_changed_movies(self, catalog):
+        """Test that only changed catalog movies end up in the delta."""
+        assert add_movies.refresh_metadata(**catalog) == 2
+        delta = metadata_delta.read_delta(catalog['delta_path'])
+        assert sorted(delta.index) == [1, 2]
+        assert delta.loc[1, 'popularity'] == 90.0
+        assert delta.loc[1, 'posters'].endswith('/new1.jpg')
+        assert delta.loc[1, 'Top actor list'] == ['Actor A', 'Actor C', 'Actor X']
+        assert 'Actors bin' not in delta.columns  # Encoded when the delta is applied
+
+    def test_refresh_fetches_only_catalog_movies(self, catalog):
+        """Test that details are never requested for movies we do not have."""
+        add_movies.refresh_metadata(**catalog)
+        detail_paths = [p for p, _ in StubTMDBHandler.requests_seen if p != '/movie/changes']
+        assert sorted(detail_paths) == ['/movie/1', '/movie/2']
+
+    def test_catalog_is_not_rewritten(self, catalog):
+        """Test that the catalog file is left untouched."""
+        with open(catalog['catalog_path']) as f:
+            before = f.read()
+        add_movies.refresh_metadata(**catalog)
+        with open(catalog['catalog_path']) as f:
+            assert f.read() == before
+
+    def test_window_starts_at_last_run(self, catalog):
+        """Test that the next run only asks for changes since the previous one."""
+        add_movies.refresh_metadata(**catalog)
+        with open(catalog['state_path']) as f:
+            last_run = datetime.fromisoformat(json.load(f)['last_run'])
+
+        StubTMDBHandler.requests_seen.clear()
+        add_movies.refresh_metadata(**catalog)
+        starts = {q['start_date'][0] for p, q in StubTMDBHandler.requests_seen if p == '/movie/changes'}
+        assert starts == {last_run.date().isoformat()}
+
+    def test_long_window_is_split(self, catalog):
+        """Test that windows longer than TMDB allows are queried in chunks."""
+        since = datetime.now(timezone.utc) - timedelta(days=30)
+        add_movies.refresh_metadata(since=since, **catalog)
+        windows = {(q['start_date'][0], q['end_date'][0])
+                   for p, q in StubTMDBHandler.requests_seen if p == '/movie/changes'}
+        assert len(windows) == 3
+
+    def test_network_error_fails_only_that_movie(self, catalog, monkeypatch):
+        """Test that a dropped request keeps the other updates but not the window."""
+        monkeypatch.setattr(StubTMDBHandler, 'dropped', {2})
+        assert add_movies.refresh_metadata(**catalog) == 1
+        assert list(metadata_delta.read_delta(catalog['delta_path']).index) == [1]
+        assert not os.path.exists(catalog['state_path'])
+
+    def test_delta_merges_with_previous_runs(self, catalog):
+        """Test that a later refresh keeps earlier, unrelated updates."""
+        metadata_delta.write_delta(catalog['delta_path'], [{
+            'id': 3, 'popularity': 1.0, 'posters': 'x.jpg', 'Top actor list': [],
+            'Director list': [], 'Actors bin': [0, 0, 0], 'Director bin': [0, 0],
+        }])
+        add_movies.refresh_metadata(**catalog)
+        assert sorted(metadata_delta.read_delta(catalog['delta_path']).index) == [1, 2, 3]
+
+    def test_load_data_applies_delta(self, catalog):
+        """Test that loading the catalog applies the delta and normalizes again."""
+        import config
+        if not os.path.exists(config.MOVIE_DATA_PATH):
+            pytest.skip("Movie data file not found")
+        import my_functions as myfn
+
+        add_movies.refresh_metadata(**catalog)
+        df = myfn.load_data(catalog['catalog_path'], delta_path=catalog['delta_path'])
+        assert list(df['raw popularity']) == [90.0, 5.0, 30.0]
+        assert df.loc[1, 'popularity'] == 1.0
+        assert df.loc[2, 'popularity'] == 0.0
+        assert df.loc[2, 'Director list'] == ['Director A']
+        # Encoded in the catalog's own order, unknown actors stay 0
+        assert df.loc[1, 'Actors bin'] == [1, 1, 0]
+        assert df.loc[2, 'Director bin'] == [0, 1]
+        assert df.loc[3, 'Actors bin'] == [0, 1, 0]  # Not refreshed
+
+    def test_unknown_credits_keep_catalog_credits(self, catalog, monkeypatch):
+        """Test that a cast entirely unknown to the catalog does not zero the vector."""
+        import config
+        if not os.path.exists(config.MOVIE_DATA_PATH):
+            pytest.skip("Movie data file not found")
+        import my_functions as myfn
+
+        monkeypatch.setitem(CHANGED, 2, dict(CHANGED[2], cast=['Actor Y', 'Actor Z']))
+        add_movies.refresh_metadata(**catalog)
+        df = myfn.load_data(catalog['catalog_path'], delta_path=catalog['delta_path'])
+        assert df.loc[2, 'Top actor list'] == ['Actor C']
+        assert df.loc[2, 'Actors bin'] == [1, 0, 0]
+        assert df.loc[2, 'raw popularity'] == 5.0
+
+    def test_apply_delta_swaps_in_a_copy(self, tmp_path):
+        """Test that applying a delta replaces the served data instead of mutating it."""
+        import config
+        if not os.path.exists(config.MOVIE_DATA_PATH):
+            pytest.skip("Movie data file not found")
+        import my_functions as myfn
+
+        old = myfn.df
+        movie_id = old.index[0]
+        raw_popularity = old.loc[movie_id, 'raw popularity']
+        row = {col: old.loc[movie_id, col] for col in metadata_delta.DELTA_COLUMNS[1:]}
+        delta_path = str(tmp_path / 'delta.csv')
+        metadata_delta.write_delta(delta_path, [{'id': movie_id, 'popularity': raw_popularity + 1, **row}])
+        try:
+            assert myfn.apply_metadata_delta(delta_path) == 1
+            assert myfn.df is not old
+            assert old.loc[movie_id, 'raw popularity'] == raw_popularity
+            assert myfn.df.loc[movie_id, 'raw popularity'] == raw_popularity + 1
+        finally:
+            myfn.reload_data()
@@ -0,0 +1,274 @@
+"""
+Unit tests for the sharded deployment.
+Shards run as local processes standing in for separate nodes.
+"""
+import os
+import secrets
+import socket
+import sys
+from ast import literal_eval
+
+import pandas as pd
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+
+pytestmark = pytest.mark.skipif(not os.path.exists(config.MOVIE_DATA_PATH),
+                                reason="Movie data file not found")
+
+AUTHKEY = secrets.token_hex(16)
+
+
+def start_cluster(tmp_path_factory, num_shards, scheme):
+    import sharding
+    out_dir = tmp_path_factory.mktemp(f"shards_{scheme}")
+    manifest_path = sharding.partition_catalog(str(out_dir), num_shards, scheme)
+    processes, addresses = sharding.start_local_shards(manifest_path, authkey=AUTHKEY)
+    return manifest_path, processes, addresses
+
+
+@pytest.fixture(scope='module')
+def hash_cluster(tmp_path_factory):
+    import sharding
+    manifest_path, processes, addresses = start_cluster(tmp_path_factory, 3, 'hash')
+    yield manifest_path, addresses
+    sharding.stop_local_shards(processes)
+
+
+@pytest.fixture(scope='module')
+def zero_vector_cluster(tmp_path_factory):
+    """Two shards over a catalog where some movies have no known actors (all-zero vector)."""
+    import sharding
+    catalog = pd.read_csv(config.MOVIE_DATA_PATH, index_col='id')
+    no_actors = str([0] * len(literal_eval(catalog['Actors bin'].iloc[0])))
+    catalog.iloc[::3, catalog.columns.get_loc('Actors bin')] = no_actors
+    catalog_path = str(tmp_path_factory.mktemp("zero_vectors") / 'movie_data.csv')
+    catalog.to_csv(catalog_path)
+
+    out_dir = tmp_path_factory.mktemp("shards_zero")
+    manifest_path = sharding.partition_catalog(str(out_dir), 2, 'hash', catalog_path=catalog_path,
+                                               delta_path='')
+    processes, addresses = sharding.start_local_shards(manifest_path, authkey=AUTHKEY)
+    yield catalog_path, manifest_path, addresses
+    sharding.stop_local_shards(processes)
+
+
+@pytest.fixture(scope='module')
+def range_cluster(tmp_path_factory):
+    import sharding
+    manifest_path, processes, addresses = start_cluster(tmp_path_factory, 2, 'range')
+    yield manifest_path, addresses
+    sharding.stop_local_shards(processes)
+
+
+def sample_movies(n=8):
+    import my_functions as myfn
+    return [movie_id for movie_id, _ in myfn.get_all_movies()[::max(len(myfn.df) // n, 1)]][:n]
+
+
+def unused_address():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()
+
+
+class TestPartition:
+    """Test splitting the catalog into shards."""
+
+    def test_every_movie_in_exactly_one_shard(self, tmp_path):
+        """Test that the shards together hold the catalog once."""
+        import sharding
+        manifest_path = sharding.partition_catalog(str(tmp_path), 4, 'hash', chunksize=50)
+        manifest = sharding.load_manifest(manifest_path)
+        catalog = pd.read_csv(config.MOVIE_DATA_PATH, index_col='id')
+
+        ids = []
+        for shard, name in enumerate(manifest['shards']):
+            shard_df = pd.read_csv(os.path.join(tmp_path, name), index_col='id')
+            assert all(sharding.shard_of(i, manifest) == shard for i in shard_df.index)
+            ids.extend(shard_df.index)
+        assert sorted(ids) == sorted(catalog.index)
+
+    def test_delta_credits_encoded_like_single_node(self, tmp_path):
+        """Test that shards encode a delta's credits like load_data does."""
+        import metadata_delta
+        import my_functions as myfn
+        import sharding
+        catalog = myfn.load_data(config.MOVIE_DATA_PATH, delta_path='')
+        first, second = catalog.index[:2]
+        delta_path = str(tmp_path / 'delta.csv')
+        metadata_delta.write_delta(delta_path, [{
+            'id': first, 'popularity': 1.0, 'posters': '',
+            'Top actor list': catalog.loc[second, 'Top actor list'],
+            'Director list': catalog.loc[second, 'Director list'],
+        }])
+
+        manifest_path = sharding.partition_catalog(str(tmp_path / 'shards'), 2, 'hash',
+                                                   delta_path=delta_path, chunksize=7)
+        manifest = sharding.load_manifest(manifest_path)
+        shard = manifest['shards'][sharding.shard_of(first, manifest)]
+        shard_df = myfn.load_data(os.path.join(manifest['dir'], shard), delta_path='')
+        expected = myfn.load_data(config.MOVIE_DATA_PATH, delta_path=delta_path)
+        for col in ['Actors bin', 'Director bin']:
+            assert shard_df.loc[first, col] == expected.loc[first, col] == catalog.loc[second, col]
+
+    def test_range_shards_are_balanced(self, tmp_path):
+        """Test that range partitioning splits the ids into equal parts."""
+        import sharding
+        manifest = sharding.load_manifest(sharding.partition_catalog(str(tmp_path), 3, 'range'))
+        sizes = [len(pd.read_csv(os.path.join(tmp_path, name))) for name in manifest['shards']]
+        assert max(sizes) - min(sizes) <= 1
+
+
+class TestShardServer:
+    """Test starting shard servers."""
+
+    def test_shards_do_not_load_full_catalog(self, tmp_path, monkeypatch):
+        """Test that a shard process starts without access to the full catalog."""
+        import sharding
+        manifest_path = sharding.partition_catalog(str(tmp_path), 2, 'hash')
+        monkeypatch.setenv('MOVIE_DATA_PATH', str(tmp_path / 'missing.csv'))
+        processes, addresses = sharding.start_local_shards(manifest_path, authkey=AUTHKEY)
+        try:
+            router = sharding.ShardRouter(manifest_path, addresses, authkey=AUTHKEY)
+            assert router.ping() == [0, 1]
+            router.close()
+        finally:
+            sharding.stop_local_shards(processes)
+
+
+class TestShardRouter:
+    """Test scatter-gather queries against local shard processes."""
+
+    def test_hash_shards_match_single_node(self, hash_cluster):
+        """Test that the merged results equal get_recommendations."""
+        import my_functions as myfn
+        import sharding
+        router = sharding.ShardRouter(*hash_cluster, authkey=AUTHKEY)
+        for movie_id in sample_movies():
+            result = router.get_recommendations(movie_id, K=5)
+            assert not result.partial
+            assert result.recommendations == myfn.get_recommendations(movie_id, K=5)
+        router.close()
+
+    def test_range_shards_match_single_node(self, range_cluster):
+        """Test that range partitioning gives the same results too."""
+        import my_functions as myfn
+        import sharding
+        router = sharding.ShardRouter(*range_cluster, authkey=AUTHKEY)
+        for movie_id in sample_movies(4):
+            assert router.get_recommendations(movie_id, K=5).recommendations == \
+                myfn.get_recommendations(movie_id, K=5)
+        router.close()
+
+    @pytest.mark.filterwarnings("ignore:invalid value encountered:RuntimeWarning")
+    def test_zero_vectors_match_single_node(self, zero_vector_cluster):
+        """Test that undefined (NaN) distances of all-zero vectors are ordered the same way."""
+        import my_functions as myfn
+        import sharding
+        catalog_path, manifest_path, addresses = zero_vector_cluster
+        router = sharding.ShardRouter(manifest_path, addresses, authkey=AUTHKEY)
+        try:
+            myfn.reload_data(catalog_path, delta_path='')
+            # Movies without actors themselves, so every actor distance is undefined
+            for movie_id in list(myfn.df.index[::3][:4]) + list(myfn.df.index[1::3][:2]):
+                k = len(myfn.df)
+                assert router.get_recommendations(movie_id, K=k).recommendations == \
+                    myfn.get_recommendations(movie_id, K=k)
+        finally:
+            myfn.reload_data()
+            router.close()
+
+    def test_filters_match_single_node(self, hash_cluster):
+        """Test that filters are applied on the shards like on a single node."""
+        import my_functions as myfn
+        import sharding
+        router = sharding.ShardRouter(*hash_cluster, authkey=AUTHKEY)
+        movie_id = sample_movies(1)[0]
+        query = dict(K=4, genres=[myfn.get_all_genres()[0]], min_popularity=0.2,
+                     exclude_ids=[rec_id for _, rec_id in myfn.get_recommendations(movie_id, K=2)])
+        assert router.get_recommendations(movie_id, **query).recommendations == \
+            myfn.get_recommendations(movie_id, **query)
+        router.close()
+
+    def test_authkey_is_required(self, hash_cluster, monkeypatch):
+        """Test that there is no default authkey to fall back on."""
+        import sharding
+        monkeypatch.setattr(config, 'SHARD_AUTHKEY', None)
+        with pytest.raises(ValueError):
+            sharding.ShardRouter(*hash_cluster)
+
+    def test_wrong_authkey_is_rejected(self, hash_cluster):
+        """Test that shards do not answer a router with another authkey."""
+        import sharding
+        router = sharding.ShardRouter(*hash_cluster, authkey=AUTHKEY + 'x', timeout=2)
+        assert router.ping() == []
+        router.close()
+
+    def test_unknown_movie(self, hash_cluster):
+        """Test that an unknown movie id raises KeyError."""
+        import sharding
+        router = sharding.ShardRouter(*hash_cluster, authkey=AUTHKEY)
+        with pytest.raises(KeyError):
+            router.get_recommendations(-99999)
+        router.close()
+
+    def test_missing_shard_gives_partial_result(self, hash_cluster):
+        """Test that a shard that is down is reported and the rest still answer."""
+        import sharding
+        manifest_path, addresses = hash_cluster
+        manifest = sharding.load_manifest(manifest_path)
+        movie_id = next(m for m in sample_movies() if sharding.shard_of(m, manifest) != 2)
+
+        router = sharding.ShardRouter(manifest_path, addresses[:2] + [unused_address()],
+                                      authkey=AUTHKEY, timeout=2)
+        result = router.get_recommendations(movie_id, K=5)
+        assert result.partial
+        assert result.missing_shards == [2]
+        assert len(result.recommendations) == 5
+        assert all(sharding.shard_of(rec_id, manifest) != 2 for _, rec_id in result.recommendations)
+        router.close()
+
+    def test_slow_shard_times_out(self, hash_cluster):
+        """Test that a shard that never answers does not block the query."""
+        import time
+        import sharding
+        manifest_path, addresses = hash_cluster
+        manifest = sharding.load_manifest(manifest_path)
+        movie_id = next(m for m in sample_movies() if sharding.shard_of(m, manifest) != 1)
+
+        with socket.socket() as silent:  # Accepts connections, never replies
+            silent.bind(('127.0.0.1', 0))
+            silent.listen()
+            router = sharding.ShardRouter(manifest_path,
+                                          [addresses[0], silent.getsockname(), addresses[2]],
+                                          authkey=AUTHKEY, timeout=1)
+            start = time.monotonic()
+            result = router.get_recommendations(movie_id, K=5)
+            assert time.monotonic() - start < 5
+        assert result.partial
+        assert result.missing_shards == [1]
+        router.close()
+
+    def test_silent_shard_does_not_leak_threads(self, hash_cluster):
+        """Test that repeated queries to a hanging shard reuse a bounded set of threads."""
+        import threading
+        import sharding
+        manifest_path, addresses = hash_cluster
+        manifest = sharding.load_manifest(manifest_path)
+        movie_id = next(m for m in sample_movies() if sharding.shard_of(m, manifest) != 1)
+
+        before = threading.active_count()
+        with socket.socket() as silent:
+            silent.bind(('127.0.0.1', 0))
+            silent.listen()
+            router = sharding.ShardRouter(manifest_path,
+                                          [addresses[0], silent.getsockname(), addresses[2]],
+                                          authkey=AUTHKEY, timeout=0.2, workers=4)
+            for _ in range(20):
+                assert 1 in router.get_recommendations(movie_id, K=5).missing_shards
+            assert threading.active_count() <= before + 4
+            router.close()
@@ -0,0 +1,131 @@
+"""
+Unit tests for the access log and background cache warm-up.
+"""
+import json
+import os
+import sys
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from access_log import AccessLog
+
+
+class TestAccessLog:
+    """Test persisted request counts."""
+
+    def test_most_common_order(self, tmp_path):
+        """Test that the most requested movies come first."""
+        log = AccessLog(path=str(tmp_path / 'log.json'), flush_seconds=3600)
+        for movie_id in [3, 1, 3, 2, 3, 1]:
+            log.record(movie_id)
+        assert log.most_common(2) == [3, 1]
+
+    def test_flush_persists_counts(self, tmp_path):
+        """Test that counts survive a restart."""
+        path = str(tmp_path / 'log.json')
+        log = AccessLog(path=path, flush_seconds=3600)
+        log.record(5)
+        log.record(5)
+        log.flush()
+        with open(path) as f:
+            assert json.load(f) == {'5': 2}
+        assert AccessLog(path=path).most_common(1) == [5]
+
+    def test_workers_share_file(self, tmp_path):
+        """Test that two loggers on one file add up instead of overwriting."""
+        path = str(tmp_path / 'log.json')
+        first = AccessLog(path=path, flush_seconds=3600)
+        second = AccessLog(path=path, flush_seconds=3600)
+        first.record(1)
+        second.record(1)
+        second.record(2)
+        first.flush()
+        second.flush()
+        with open(path) as f:
+            assert json.load(f) == {'1': 2, '2': 1}
+
+
+class TestWarmup:
+    """Test the warm-up scheduler."""
+
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        """Setup for tests - skip if data file not found."""
+        import config
+        if not os.path.exists(config.MOVIE_DATA_PATH):
+            pytest.skip("Movie data file not found")
+
+    def test_plan_prefers_requested_movies(self, tmp_path, monkeypatch):
+        """Test that requested movies are planned before popular ones."""
+        import my_functions as myfn
+        from warmup import WarmupScheduler
+        monkeypatch.setattr(myfn, 'access_log', AccessLog(path=str(tmp_path / 'log.json')))
+        movie_id = myfn.df['popularity'].idxmin()
+        myfn.access_log.record(movie_id)
+        plan = WarmupScheduler(top_popular=5, top_accessed=1).plan()
+        assert plan[0] == movie_id
+        assert len(plan) == 6
+
+    def test_warmup_fills_cache(self):
+        """Test that a warm-up run caches recommendations for the plan."""
+        import config
+        import my_functions as myfn
+        from warmup import WarmupScheduler
+        if not config.ENABLE_CACHE:
+            pytest.skip("Cache disabled")
+        myfn.get_recommendations_cached.cache_clear()
+
+        scheduler = WarmupScheduler(top_popular=3, top_accessed=0, cpu_fraction=1.0)
+        scheduler.start()
+        scheduler.join(timeout=60)
+
+        status = scheduler.status()
+        assert status['state'] == 'done'
+        assert status['done'] == status['total'] == 3
+        hits = myfn.get_recommendations_cached.cache_info().hits
+        myfn.get_recommendations(scheduler.plan()[0])
+        assert myfn.get_recommendations_cached.cache_info().hits == hits + 1
+
+    def test_time_budget_stops_run(self):
+        """Test that a run stops once its time budget is spent."""
+        from warmup import WarmupScheduler
+        scheduler = WarmupScheduler(top_popular=50, top_accessed=0,
+                                    time_budget=1e-9, cpu_fraction=1.0)
+        scheduler.start()
+        scheduler.join(timeout=60)
+        assert scheduler.status()['state'] == 'over budget'
+
+    def test_result_computed_across_reload_is_not_served(self, monkeypatch):
+        """Test that a result computed while the data was swapped is recomputed."""
+        import my_functions as myfn
+        compute = myfn._compute_recommendations
+        calls = []
+
+        def swapped_midway(*args):
+            calls.append(args)
+            if len(calls) == 1:
+                myfn._swap_data(myfn.df, myfn.data_version)
+                return [('stale', 0.0, -1)]
+            return compute(*args)
+
+        monkeypatch.setattr(myfn, '_compute_recommendations', swapped_midway)
+        movie_id = myfn.df.index[0]
+        recommendations = myfn.get_recommendations(movie_id, record_access=False)
+        assert len(calls) == 2
+        assert ('stale', 0.0, -1) not in recommendations
+        assert myfn.get_recommendations(movie_id, record_access=False) == recommendations
+
+    def test_restart_does_not_wait_for_running_warmup(self):
+        """Test that replacing a run returns at once and only the new run reports status."""
+        import time
+        from warmup import WarmupScheduler
+        scheduler = WarmupScheduler(top_popular=50, top_accessed=0, cpu_fraction=0.01)
+        scheduler.start()
+        started = time.monotonic()
+        scheduler.start()
+        assert time.monotonic() - started < 0.5
+        scheduler.stop(timeout=60)
+        assert scheduler.status()['state'] == 'stopped'
@@ -0,0 +1,170 @@
+"""
+Background cache warm-up for the Movie Recommendation System.
+
+After a start or a data reload the recommendation cache is empty. The
+scheduler in this module precomputes recommendations for the most requested
+movies (from the access log) and the most popular ones in a low-priority
+daemon thread, within a wall-clock budget and a CPU duty cycle, so serving
+requests never waits for it.
+"""
+import logging
+import os
+import sys
+import threading
+import time
+
+import config
+import my_functions as myfn
+
+logger = logging.getLogger(__name__)
+
+
+class WarmupScheduler:
+    """Precomputes recommendations for likely requests in the background.
+
+    Args:
+        top_popular: Number of most popular movies to warm
+        top_accessed: Number of most requested movies to warm
+        time_budget: Seconds after which a warm-up run gives up
+        cpu_fraction: Share of wall-clock time the thread may spend computing
+    """
+
+    def __init__(self, top_popular=None, top_accessed=None, time_budget=None,
+                 cpu_fraction=None):
+        self.top_popular = config.WARMUP_TOP_POPULAR if top_popular is None else top_popular
+        self.top_accessed = config.WARMUP_TOP_ACCESSED if top_accessed is None else top_accessed
+        self.time_budget = time_budget or config.WARMUP_TIME_BUDGET
+        self.cpu_fraction = min(max(cpu_fraction or config.WARMUP_CPU_FRACTION, 0.01), 1.0)
+
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self._status = {'state': 'idle', 'done': 0, 'total': 0, 'elapsed': 0.0}
+
+    def plan(self):
+        """Movie ids to warm, most requested first, then most popular."""
+        ids = myfn.access_log.most_common(self.top_accessed)
+        if self.top_popular:
+            ids += list(myfn.df['popularity'].nlargest(self.top_popular).index)
+
+        planned = []
+        seen = set()
+        for movie_id in ids:
+            if movie_id in myfn.df.index and movie_id not in seen:
+                seen.add(movie_id)
+                planned.append(movie_id)
+        return planned
+
+    def start(self):
+        """Start a warm-up run, replacing one that is still in progress.
+
+        Does not wait for the replaced run: it stops after its current movie,
+        so this is safe to call from a thread that is serving a user.
+        """
+        with self._lock:
+            self._stop.set()
+            self._stop = threading.Event()
+            self._thread = threading.Thread(target=self._run, args=(self._stop,),
+                                            name="cache-warmup", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=None):
+        """Ask the current run to stop and wait for it."""
+        with self._lock:
+            thread = self._thread
+            self._stop.set()
+        if thread is not None:
+            thread.join(timeout)
+
+    def join(self, timeout=None):
+        """Wait for the current run to finish."""
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def status(self):
+        """Snapshot of the warm-up progress.
+
+        Returns:
+            Dict with state ('idle', 'running', 'done', 'stopped' or
+            'over budget'), number of movies done, total planned and seconds elapsed
+        """
+        with self._lock:
+            return dict(self._status)
+
+    def _update(self, stop, **kwargs):
+        with self._lock:
+            # A replaced run still finishing its last movie must not overwrite the status
+            if stop is self._stop:
+                self._status.update(kwargs)
+
+    def _run(self, stop):
+        _lower_thread_priority()
+        started = time.monotonic()
+        ids = self.plan()
+        self._update(stop, state='running', done=0, total=len(ids), elapsed=0.0)
+        logger.info("Cache warm-up started for %d movies", len(ids))
+
+        state = 'done'
+        done = 0
+        for movie_id in ids:
+            if stop.is_set():
+                state = 'stopped'
+                break
+            if time.monotonic() - started > self.time_budget:
+                state = 'over budget'
+                break
+
+            t0 = time.monotonic()
+            try:
+                myfn.precompute_recommendations(movie_id)
+            except Exception:
+                logger.exception("Cache warm-up failed for movie %s", movie_id)
+            spent = time.monotonic() - t0
+            done += 1
+            self._update(stop, done=done, elapsed=time.monotonic() - started)
+
+            # Idle long enough to keep the thread at its share of CPU time
+            stop.wait(spent * (1 - self.cpu_fraction) / self.cpu_fraction)
+
+        elapsed = time.monotonic() - started
+        self._update(stop, state=state, elapsed=elapsed)
+        logger.info("Cache warm-up %s: %d/%d movies in %.1fs", state, done, len(ids), elapsed)
+
+
+def _lower_thread_priority():
+    """Give the calling thread the lowest scheduling priority, where supported.
+
+    Linux applies nice values per thread, other platforms to the whole process,
+    so this is only done on Linux.
+    """
+    if sys.platform.startswith('linux'):
+        try:
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 19)
+        except (AttributeError, OSError):
+            pass
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def start_warmup():
+    """Start warming the cache now and again after every data reload.
+
+    Returns:
+        The process-wide WarmupScheduler
+    """
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = WarmupScheduler()
+            myfn.on_reload(_start_if_enabled)
+        _start_if_enabled()
+        return _scheduler
+
+
+def _start_if_enabled():
+    # Without the cache there is nothing to warm
+    if config.ENABLE_CACHE and config.ENABLE_WARMUP:
+        _scheduler.start()